@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+# To evaluate Assignment 1, run the following command in the deployer container
+# curl -s https://cs531-f19.github.io/discussions/members.csv | ./evaluator.py cs531a1 a1
+
+import os
+import sys
+import csv
+import datetime
+import threading
+import subprocess
+import concurrent.futures
+
+import requests
+
+from servertester.base.httptester import HTTPTester
+
+# Deployment service that builds and runs students' servers
+DEPLOYER = os.getenv("DEPLOYER", "http://cs531.cs.odu.edu")
+COURCEID = os.getenv("COURCEID", "cs531")
+# This is needed if student repos are kept private
+CREDENTIALS = os.getenv("GITHUBKEY", "")
+# Students are graded concurrently, each stage of their pipeline is limited to this many at a time
+DOWNLOAD_JOBS = int(os.getenv("DOWNLOAD_JOBS", 8))
+# Image builds are CPU heavy
+DEPLOY_JOBS = int(os.getenv("DEPLOY_JOBS", 2))
+# Tests mostly wait on the network
+TEST_JOBS = int(os.getenv("TEST_JOBS", 8))
+# Seconds to wait at most for a deployed server to get ready before testing it
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", 60))
+# Request template (relative to `messages`) whose valid response also makes a server ready, if set
+READY_MSG_FILE = os.getenv("READY_MSG_FILE")
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+stages = {
+    "download": threading.Semaphore(DOWNLOAD_JOBS),
+    "deploy": threading.Semaphore(DEPLOY_JOBS),
+    "test": threading.Semaphore(TEST_JOBS)
+}
+print_lock = threading.Lock()
+
+
+def log(msg):
+    with print_lock:
+        print(msg, flush=True)
+
+
+def done_marker(userdir, tag, suite):
+    """Path of the file that marks a student as graded for the tag and suite, so that a resumed run skips them"""
+    return os.path.join(userdir, f".{tag}-{suite}.done")
+
+
+def download_code(ghid, repo, tag, code):
+    """Download the tarball of the repo at the tag, return whether it succeeded"""
+    cred = CREDENTIALS + "@" if CREDENTIALS else ""
+    try:
+        res = requests.get(f"https://{cred}github.com/{ghid}/{repo}/archive/{tag}.tar.gz", stream=True, timeout=60)
+        if res.status_code != 200:
+            return False
+        with open(code, "wb") as f:
+            for chunk in res.iter_content(65536):
+                f.write(chunk)
+        return True
+    except Exception as e:
+        return False
+
+
+def call_deployer(path, rep):
+    """Call a deployer endpoint and append its response text to the report, return whether it succeeded"""
+    try:
+        res = requests.get(f"{DEPLOYER}{path}")
+        rep.write(res.text)
+        return res.ok
+    except Exception as e:
+        rep.write(f"{e}")
+        return False
+
+
+def grade(member, suite, tag, outdir):
+    """Run the download, deploy, readiness, test, and destroy pipeline of a student and write their report"""
+    csid, name, ghid, repo = member["csid"], member["name"], member["ghid"], member["repo"]
+    userdir = os.path.join(outdir, csid)
+    os.makedirs(userdir, exist_ok=True)
+    if os.path.exists(done_marker(userdir, tag, suite)):
+        log(f"Skipping already graded: {csid}")
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    outfile = os.path.join(userdir, f"{csid}-{tag}-{suite}-{now:%Y%m%d-%H%M%S}")
+    report = f"{outfile}-report.txt"
+    code = f"{outfile}-code.tar.gz"
+    server = f"{COURCEID}-{csid}"
+
+    with stages["download"]:
+        log(f"Downloading code: {code}")
+        download_code(ghid, repo, tag, code)
+
+    log(f"Creating report: {report}")
+    with open(report, "w") as rep:
+        rep.write("=" * 80 + "\n")
+        rep.write(f"Assignment: {suite}\n")
+        rep.write(f"Student: {name} <{csid}@cs.odu.edu>\n")
+        rep.write(f"Time: {now:%Y%m%d-%H%M%S %Z}\n")
+        rep.write(f"Repository: https://github.com/{ghid}/{repo}/tree/{tag}\n")
+        rep.write(f"Server: {server}\n")
+        rep.write("=" * 80 + "\n")
+
+        rep.write(f"\nDeploying server: {server}\n\n")
+        log(f"Deploying server: {server}")
+        with stages["deploy"]:
+            deployed = call_deployer(f"/servers/deploy/{csid}/{tag}?wait=1", rep)
+        rep.write("\n")
+
+        tested = False
+        try:
+            # A failed deployment has nothing to wait for
+            readiness = HTTPTester(server).wait_ready(READY_TIMEOUT if deployed else 0, READY_MSG_FILE)
+            if not readiness["ready"]:
+                rep.write(f"\nServer not ready: {readiness['error']}\n")
+                log(f"Server not ready: {server}")
+            else:
+                rep.write(f"\nServer ready in {readiness['time_to_ready']:.2f} seconds\n")
+                rep.write(f"\nTesting server: {server} against {suite} test suite\n\n")
+                log(f"Testing server: {server} against {suite} test suite")
+                rep.flush()
+                with stages["test"]:
+                    subprocess.run([sys.executable, os.path.join(ROOT_DIR, "main.py"), server, suite], stdout=rep, stderr=subprocess.STDOUT, cwd=ROOT_DIR)
+                tested = True
+        finally:
+            # A deployed server is destroyed even if it never got ready or testing it failed
+            if deployed:
+                rep.write(f"\nDestroying server: {server}\n")
+                log(f"Destroying server: {server}")
+                call_deployer(f"/servers/destroy/{csid}", rep)
+                rep.write("\n")
+
+    # Only a graded student is skipped on resume, a failed deployment or readiness is retried
+    if not tested:
+        log(f"Not graded, retrying on resume: {csid}")
+        return
+    with open(done_marker(userdir, tag, suite), "w") as f:
+        f.write(f"{report}\n")
+
+
+if __name__ == "__main__":
+    suite = sys.argv[1] if len(sys.argv) > 1 else "example"
+    tag = sys.argv[2] if len(sys.argv) > 2 else "main"
+    outdir = sys.argv[3] if len(sys.argv) > 3 else "reports"
+    if len(sys.argv) < 3 and suite.startswith("cs531"):
+        tag = suite[len("cs531"):]
+
+    members = list(csv.DictReader(sys.stdin))
+    # Enough workers to keep every stage busy, the stages limit how many of them do the same thing at a time
+    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_JOBS + DEPLOY_JOBS + TEST_JOBS) as executor:
+        futures = {executor.submit(grade, member, suite, tag, outdir): member["csid"] for member in members}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                log(f"Grading {futures[future]} failed: {e}")
+
+    log("All done!")
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import re
+import inspect
 import collections
+import queue
+import concurrent.futures
 
 from servertester.base.httptester import HTTPTester
+from servertester.base.bench import Bench
+from servertester.base.histogram import Histogram
+from servertester.base.pool import ConnectionPool
+from servertester.base.breaker import CircuitBreaker
+from servertester.base.store import ResultStore
 from servertester.testsuites import *
 
 
@@ -12,13 +21,85 @@ if __name__ == "__main__":
     def print_help():
         print("")
         print("Usage:")
-        print("./main.py [[<host>]:[<port>] [<suite-id> [<test-id>]]]")
+        print("./main.py [-j <jobs>] [-p] [-a] [-w <wait>] [-s <store>] [[<host>]:[<port>] [<suite-id> [<test-id>]]]")
         print("")
+        print("<jobs>      Number of test cases to run in parallel (default: '1')")
+        print("-p          Reuse kept alive connections across tests that do not check connection lifecycle")
+        print("-a          Adapt socket timeouts to the round trip times to the server measured upfront")
+        print("<wait>      Seconds to wait at most for the server to accept connections before testing (default: '0')")
+        print("<store>     SQLite file to keep the history of results in (default: '$RESULTSDB', if set)")
         print("<host>      Hostname or IP address of the server to be tested (default: 'localhost')")
         print("<port>      Port number of the server to be tested (default: '80')")
         print("<suite-id>  ID of a test suite (e.g., 'example', default: all test suites)")
         print("<test-id>   ID of an individual test function (e.g., 'test_healthy_server')")
         print("")
+        print("./main.py bench [<host>]:[<port>] <msg-file> [-r <rate>] [-c <concurrency>] [-d <duration>] [-k] [-s <sample> --check <check>[=<args>]...] [<PLACEHOLDER>=<value>...]")
+        print("")
+        print("<msg-file>     Path of a request message template relative to 'messages' (e.g., 'cs531/get-url.http')")
+        print("<rate>         Target requests per second scheduled open-loop (default: as fast as the concurrency allows)")
+        print("<concurrency>  Number of requests in flight at most (default: '8')")
+        print("<duration>     Duration of the benchmark in seconds (default: '10')")
+        print("-k             Reuse connections when the server keeps them alive")
+        print("<sample>       Fraction of responses to validate (e.g., '0.1', default: '0')")
+        print("<check>        Name of a check helper without the 'check_' prefix and its comma separated args (e.g., 'status_is=200')")
+        print("<PLACEHOLDER>  Value of a placeholder in the template (e.g., 'PATH=/index.html')")
+        print("")
+
+    def run_bench(args):
+        opts = {"-r": None, "-c": "8", "-d": "10", "-s": "0"}
+        aliases = {"--rate": "-r", "--concurrency": "-c", "--duration": "-d", "--sample": "-s"}
+        checks = []
+        kwargs = {}
+        positional = []
+        keep_alive = False
+        while args:
+            arg = args.pop(0)
+            opt = aliases.get(arg, arg)
+            if opt in opts or opt == "--check":
+                if not args:
+                    raise ValueError(f"Option `{arg}` expects a value")
+                if opt == "--check":
+                    name, sep, vals = args.pop(0).partition("=")
+                    # Status codes and payload sizes are compared as numbers
+                    conv = int if name in ["status_is", "payload_size"] else str
+                    checks.append((name, [conv(v) for v in vals.split(",")] if sep else []))
+                else:
+                    opts[opt] = args.pop(0)
+            elif arg in ["-k", "--keep-alive"]:
+                keep_alive = True
+            elif "=" in arg and positional:
+                k, v = arg.split("=", 1)
+                kwargs[k] = v
+            else:
+                positional.append(arg)
+        if len(positional) != 2:
+            raise ValueError("Benchmark expects a `<host>:<port>` and a `<msg-file>`")
+        t = HTTPTester(positional[0])
+        for name, vals in checks:
+            if not hasattr(t, f"check_{name}"):
+                raise ValueError(f"Unknown check `{name}`")
+            # Checks are called with the report of each validated response followed by their args
+            try:
+                inspect.signature(getattr(t, f"check_{name}")).bind(t.report_obj(), *vals)
+            except TypeError as e:
+                raise ValueError(f"Invalid arguments of check `{name}`: {e}")
+        rate = float(opts["-r"]) if opts["-r"] else None
+        bench = Bench(t, positional[1], rate=rate, concurrency=int(opts["-c"]), duration=float(opts["-d"]), keep_alive=keep_alive, sample=float(opts["-s"]), checks=checks, **kwargs)
+        print(f"Benchmarking {t.hostport} with `{positional[1]}` for {bench.duration}s " + (f"at {rate} req/s" if rate else f"with {bench.concurrency} concurrent requests"))
+        stats = bench.run()
+        print(f"{' BENCHMARK ':=^80}")
+        throughput = f"{stats['throughput']:.1f} req/s"
+        print(f"Requests: {stats['requests']} in {stats['elapsed']:.2f}s, Throughput: {colorize(throughput, 96)}")
+        print(f"Errors: {stats['errors']} ({stats['error_rate']:.2%})")
+        for err, count in stats["top_errors"]:
+            print(colorize(f"[{count}] {err}"))
+        latency = ", ".join(f"{p}: {v * 1000:.1f}" for p, v in stats["latency"].items() if v is not None)
+        print(f"Latency (ms): {latency}")
+        if stats["validated"]:
+            print(f"Validated: {stats['validated']}, Failed: {stats['failures']}")
+            for failure, count in stats["top_failures"]:
+                print(colorize(f"[{count}] {failure}"))
+        print("=" * 79)
 
     def colorize(str, code=91):
         return f"\033[{code}m{str}\033[0m"
@@ -27,14 +108,67 @@ if __name__ == "__main__":
         print_help()
         sys.exit(0)
 
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        try:
+            run_bench(sys.argv[2:])
+        except ValueError as e:
+            print(colorize(e))
+            print_help()
+            sys.exit(1)
+        sys.exit(0)
+
+    jobs = 1
+    for opt in {"-j", "--jobs"}.intersection(sys.argv):
+        i = sys.argv.index(opt)
+        try:
+            jobs = int(sys.argv[i + 1])
+            assert jobs > 0
+        except (IndexError, ValueError, AssertionError) as e:
+            print(colorize(f"Option `{opt}` expects a positive number of parallel jobs"))
+            print_help()
+            sys.exit(1)
+        del sys.argv[i:i + 2]
+
+    pool = None
+    for opt in {"-p", "--pool"}.intersection(sys.argv):
+        pool = ConnectionPool()
+        sys.argv.remove(opt)
+
+    adaptive = False
+    for opt in {"-a", "--adaptive-timeouts"}.intersection(sys.argv):
+        adaptive = True
+        sys.argv.remove(opt)
+
+    wait = 0
+    for opt in {"-w", "--wait-ready"}.intersection(sys.argv):
+        i = sys.argv.index(opt)
+        try:
+            wait = float(sys.argv[i + 1])
+            assert wait >= 0
+        except (IndexError, ValueError, AssertionError) as e:
+            print(colorize(f"Option `{opt}` expects a number of seconds to wait for the server"))
+            print_help()
+            sys.exit(1)
+        del sys.argv[i:i + 2]
+
+    store = os.getenv("RESULTSDB")
+    for opt in {"-s", "--store"}.intersection(sys.argv):
+        i = sys.argv.index(opt)
+        if len(sys.argv) < i + 2:
+            print(colorize(f"Option `{opt}` expects a path of the SQLite file to store results in"))
+            print_help()
+            sys.exit(1)
+        store = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+
     if len(sys.argv) < 2:
         print()
         print("Following test cases are available:")
-        for sname, suite in testsuites.items():
+        for sname in testsuites:
             print()
             print(f"{f' Test Suite: {colorize(sname)} ':=^80}")
-            for fname, func in suite().testcases.items():
-                print(f"* {colorize(fname)}: {colorize(func.__doc__, 96)}")
+            for fname, meta in testsuites.testcases(sname).items():
+                print(f"* {colorize(fname)}: {colorize(meta['description'], 96)}")
         print()
         print(f"For help run: {colorize('./main.py -h')}")
         print()
@@ -84,7 +218,22 @@ if __name__ == "__main__":
                 print(f"* [Payload redacted ({result['res']['payload_size']} bytes)]")
         print()
 
-    def print_summary(hostport, test_results):
+    def print_timings(timings):
+        print("Timings per suite (min / median / p95 in ms):")
+        for sname, samples in timings.items():
+            line = []
+            for phase in ["connect", "send", "first_byte", "headers", "total"]:
+                hist = Histogram()
+                for s in samples:
+                    if s[phase] is not None:
+                        hist.record(s[phase])
+                if hist:
+                    line.append(f"{phase}: {hist.minimum() * 1000:.1f} / {hist.percentile(50) * 1000:.1f} / {hist.percentile(95) * 1000:.1f}")
+            sent = sum(s["bytes_sent"] for s in samples)
+            received = sum(s["bytes_received"] for s in samples)
+            print(f"{colorize(sname, 96)}: {', '.join(line)}; bytes sent: {sent}, received: {received}")
+
+    def print_summary(hostport, test_results, timings):
         counts = collections.Counter(test_results.values())
         colors = {"PASSED": 92, "FAILED": 91}
         print(f"{' SUMMARY ':=^80}")
@@ -94,23 +243,111 @@ if __name__ == "__main__":
             print(f"{colorize(result, colors[result])}: {test}")
         print("-" * 80)
         print(f"TOTAL: {len(test_results)}, {colorize('PASSED', 92)}: {counts['PASSED']}, {colorize('FAILED', 91)}: {counts['FAILED']}")
+        print("-" * 80)
+        if breaker.short_circuits:
+            print(colorize(f"Server unreachable, {breaker.short_circuits} requests were not attempted after repeated connection failures"))
+            print("-" * 80)
+        print_timings(timings)
         print("=" * 79)
 
+    def new_tester(suite):
+        st = suite(hostport)
+        st.pool = pool
+        st.breaker = breaker
+        if calibration:
+            st.apply_calibration(calibration)
+        return st
+
+    def run_parallel(suites, jobs):
+        """Run test cases of all the suites in a thread pool and yield results as they finish"""
+        results = queue.Queue()
+        count = 0
+
+        def run_tests(t, test_ids):
+            try:
+                for test_id in test_ids:
+                    results.put(t.run_isolated_test(test_id))
+            except Exception as e:
+                results.put(e)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            instances = [new_tester(suite) for suite in suites.values()]
+            # Long waiting test cases of all the suites go first to overlap their waits with the rest
+            for t in instances:
+                for fname in t.long_wait_tests():
+                    executor.submit(run_tests, t, [fname])
+            for t in instances:
+                serial = t.serial_tests()
+                long_wait = t.long_wait_tests()
+                # Serial test cases share a single lane to never overlap with each other
+                executor.submit(run_tests, t, serial)
+                for fname in t.TESTCASES:
+                    if fname not in serial and fname not in long_wait:
+                        executor.submit(run_tests, t, [fname])
+                count += len(t.TESTCASES)
+            for _ in range(count):
+                result = results.get()
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+
     print(f"Testing {hostport}")
+    # Tests of a server that stops accepting connections fail fast
+    breaker = CircuitBreaker()
+    if wait:
+        readiness = t.wait_ready(wait)
+        if readiness["ready"]:
+            print(f"Server ready in {readiness['time_to_ready'] * 1000:.0f} ms after {readiness['probes']} probes")
+        else:
+            print(colorize(f"Server not ready after {wait}s: {readiness['error']}"))
+    calibration = None
+    if adaptive:
+        calibration = t.calibrate_timeouts()
+        if calibration["timeouts"]:
+            timeouts = ", ".join(f"{name}: {value * 1000:.0f} ms" for name, value in calibration["timeouts"].items())
+            print(f"Timeouts calibrated with {calibration['probes']} probes: {colorize(timeouts, 96)}")
+        else:
+            print(colorize("Timeouts could not be calibrated, the server did not respond to probes"))
+
+    recorder = ResultStore(store).recorder("main") if store else None
+
+    def record(result):
+        if recorder:
+            recorder.add(hostport, result)
 
     try:
         if test_id:
-            t = suite(hostport)
+            t = new_tester(suite)
             result = t.run_single_test(test_id)
+            record(result)
             print_result(result, print_text_payload=True)
         else:
             test_results = {}
             suites = {sys.argv[2].lower(): suite} if suite else testsuites
-            for _, suite in suites.items():
-                t = suite(hostport)
-                for result in t.run_all_tests():
+            timings = {sname: [] for sname in suites}
+            if jobs > 1:
+                # Reserve slots in the original order as results arrive out of order
+                for _, suite in suites.items():
+                    test_results.update(dict.fromkeys(suite.TESTCASES))
+                for result in run_parallel(suites, jobs):
                     test_results[result["id"]] = "FAILED" if result["errors"] else "PASSED"
+                    timings[result["suite"]].append(result["res"]["timing"])
+                    record(result)
                     print_result(result)
-            print_summary(hostport, test_results)
+            else:
+                with concurrent.futures.ThreadPoolExecutor() as executor:
+                    instances = [new_tester(suite) for suite in suites.values()]
+                    # Start long waiting test cases of all the suites upfront to overlap their waits with other suites
+                    pending = [t.start_long_wait_tests(executor) for t in instances]
+                    for t, started in zip(instances, pending):
+                        for result in t.run_all_tests(started):
+                            test_results[result["id"]] = "FAILED" if result["errors"] else "PASSED"
+                            timings[result["suite"]].append(result["res"]["timing"])
+                            record(result)
+                            print_result(result)
+            print_summary(hostport, test_results, timings)
     except Exception as e:
         print(colorize(e))
+    finally:
+        if recorder:
+            recorder.close()
@@ -9,22 +9,63 @@ import requests
 import docker
 import json
 import base64
-import csv
-
+import zlib
+import uuid
+import asyncio
+import functools
+import contextlib
+import urllib.parse
+import concurrent.futures
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+
+from servertester import tester_version
 from servertester.base.httptester import HTTPTester
+from servertester.base.buffers import SpooledPayload
+from servertester.base.cache import ResultCache
+from servertester.base.jobs import JobQueue
+from servertester.base.breaker import CircuitBreaker
+from servertester.base.histogram import Histogram
+from servertester.base.store import ResultStore
+from servertester.base.roster import Roster
 from servertester.testsuites import *
 
 # This should be changed inline or supplied via the environment variable each semester the course is offered
 MEMBERSFILE = os.getenv("MEMBERSFILE", "https://cs531-f19.github.io/discussions/members.csv")
+# The members roster (a URL or a local path) is cached in this file and revalidated every this many seconds
+MEMBERSCACHE = os.getenv("MEMBERSCACHE", "members.cache.json")
+MEMBERS_REFRESH = int(os.getenv("MEMBERS_REFRESH", 600))
 COURCEID = os.getenv("COURCEID", "cs531")
 # This is needed if student repos are kept private (ideally, supply it via the environment variable)
 CREDENTIALS = os.getenv("GITHUBKEY", "")
-
-allowed_members = {}
-
+# SQLite file to keep the history of test results in
+RESULTSDB = os.getenv("RESULTSDB", "results.sqlite3")
+# Results of tests against deployed images are reused for this many seconds, within a memory budget in bytes
+RESULTCACHE_TTL = int(os.getenv("RESULTCACHE_TTL", 3600))
+RESULTCACHE_SIZE = int(os.getenv("RESULTCACHE_SIZE", 64 * 1024 * 1024))
+# Full payloads of results are kept for this many seconds to be fetched by result id, within a memory budget in bytes
+PAYLOADCACHE_TTL = int(os.getenv("PAYLOADCACHE_TTL", 3600))
+PAYLOADCACHE_SIZE = int(os.getenv("PAYLOADCACHE_SIZE", 256 * 1024 * 1024))
+# Bytes of the payload included in compact results
+PAYLOAD_PREVIEW = int(os.getenv("PAYLOAD_PREVIEW", 1024))
+# Image builds run in the background on a bounded number of workers, one at a time per student
+DEPLOY_WORKERS = int(os.getenv("DEPLOY_WORKERS", 4))
+DEPLOY_QUEUE_SIZE = int(os.getenv("DEPLOY_QUEUE_SIZE", 100))
+# Seconds to wait at most for a deployed server to accept connections
+DEPLOY_READY_TIMEOUT = float(os.getenv("DEPLOY_READY_TIMEOUT", 60))
+# Test result streams are multiplexed on an event loop, test bodies and other blocking calls run on a shared pool of this many threads
+TEST_WORKERS = int(os.getenv("TEST_WORKERS", 64))
+# Threads serving the rest of the (WSGI) app
+WSGI_WORKERS = int(os.getenv("WSGI_WORKERS", 32))
 
 app = Flask(__name__)
 client = docker.from_env()
+store = ResultStore(RESULTSDB)
+result_cache = ResultCache(RESULTCACHE_TTL, RESULTCACHE_SIZE)
+payload_cache = ResultCache(PAYLOADCACHE_TTL, PAYLOADCACHE_SIZE)
+deploy_jobs = JobQueue(workers=DEPLOY_WORKERS, per_owner=1, max_pending=DEPLOY_QUEUE_SIZE)
+test_executor = concurrent.futures.ThreadPoolExecutor(max_workers=TEST_WORKERS)
 
 try:
     client.ping()
@@ -37,32 +78,20 @@ except Exception as e:
 
 def generate_test_cases_json():
     test_cases = []
-    for sname, suite in testsuites.items():
-        for fname, func in suite().testcases.items():
-            test_cases.append({"id": fname, "description": func.__doc__, "suite": sname})
+    for sname in testsuites:
+        for fname, meta in testsuites.testcases(sname).items():
+            test_cases.append({"id": fname, "description": meta["description"], "suite": sname})
     return json.dumps(test_cases)
 
 test_cases = generate_test_cases_json()
 
 
-def load_members():
-    try:
-        res = requests.get(MEMBERSFILE)
-        if res.status_code == 200:
-            for member in csv.DictReader(res.content.decode().splitlines()):
-                allowed_members[member["csid"]] = {"name": member["name"], "ghid": member["ghid"], "repo": member["repo"]}
-    except Exception as e:
-        pass
-
-if DEPLOYER:
-    load_members()
-    if not allowed_members:
-        DEPLOYER = False
-        print("No allowed members, disabling deployment")
+# Members are loaded on first use and kept fresh in the background, requests never wait for the roster to be fetched
+roster = Roster(MEMBERSFILE, MEMBERSCACHE, MEMBERS_REFRESH)
 
 
 def get_member_repo(csid):
-    member = allowed_members.get(csid)
+    member = roster.members.get(csid)
     if member is None:
         return None
     return f"{member['ghid']}/{member['repo']}"
@@ -75,97 +104,210 @@ def get_authorized_repo_url(repo):
     return f"https://{cred}github.com/{repo}.git"
 
 
+def student_of(hostport):
+    m = re.fullmatch(f"{COURCEID}-([^:]+)(:\\d*)?", hostport)
+    return m[1] if m else None
+
+
+def deployed_image(hostport):
+    """Return the ID of the image of the deployed container serving the hostport, None if it is not a deployed container"""
+    if not DEPLOYER:
+        return None
+    try:
+        return client.containers.get(hostport.split(":")[0]).image.id
+    except Exception as e:
+        return None
+
+
+def result_cache_key(image, hostport, suiteid, test_id, adaptive=False):
+    """Return the key of a cached result, which covers everything that changes the outcome of a test against the same image.
+    The hostport should be normalized (e.g., that of an HTTPTester), as the image does not tell the port that was tested."""
+    return (image, hostport, suiteid, test_id, tester_version(), bool(adaptive))
+
+
 def jsonify_result(result):
-    result["res"]["payload"] = base64.b64encode(result["res"]["payload"]).decode() if result["res"]["payload"] else ""
+    pld = result["res"]["payload"]
+    result["result_id"] = uuid.uuid4().hex
+    # The full payload can be fetched by the result id for a while, spooled payloads are kept in their temporary file
+    if pld and len(pld) <= PAYLOADCACHE_SIZE:
+        payload = pld if isinstance(pld, SpooledPayload) else pld.tobytes()
+        payload_cache.put(result["result_id"], (payload, result["res"]["headers"].get("content-type")), len(pld))
+    # Large payloads are spooled to disk, only their in-memory head is sent along with the size and digest
+    result["res"]["payload_sha256"] = pld.sha256() if pld else ""
+    result["res"]["payload"] = base64.b64encode(pld.preview()).decode() if pld else ""
     return json.dumps(result) + "\n"
 
 
+def compact_result_line(line):
+    """Return the compact form of a result line, with a preview of the payload and without what the web UI does not render"""
+    result = json.loads(line)
+    preview = base64.b64decode(result["res"]["payload"])[:PAYLOAD_PREVIEW]
+    result["res"]["payload"] = base64.b64encode(preview).decode()
+    result["res"]["payload_truncated"] = result["res"]["payload_size"] > len(preview)
+    result.pop("description", None)
+    result["res"].pop("timeouts", None)
+    # The raw headers are rendered, only the content type is needed to render the payload
+    ctype = result["res"]["headers"].get("content-type")
+    result["res"]["headers"] = {"content-type": ctype} if ctype else {}
+    result["res"]["timing"] = {k: round(v, 6) if isinstance(v, float) else v for k, v in result["res"]["timing"].items()}
+    # Only the last result of a suite carries its latency histogram, as it has the whole of it
+    latency = result.pop("suite_latency", None)
+    if latency and latency["count"] == len(testsuites.testcases(result["suite"])):
+        result["suite_latency"] = latency
+    return json.dumps(result) + "\n"
+
+
+def accepts_gzip(accept_encoding):
+    """Return whether the value of an Accept-Encoding header allows gzip"""
+    for coding in accept_encoding.lower().replace(" ", "").split(","):
+        name, _, q = coding.partition(";q=")
+        if name in ("gzip", "*"):
+            try:
+                return float(q or 1) > 0
+            except ValueError as e:
+                return False
+    return False
+
+
+def line_encoder(gzip):
+    """Return a function that encodes a line to be flushed to the client right away, and another that returns the end of the stream"""
+    if not gzip:
+        return str.encode, bytes
+    z = zlib.compressobj(wbits=31)
+    return lambda line: z.compress(line.encode()) + z.flush(zlib.Z_SYNC_FLUSH), z.flush
+
+
+def cached_suite_lines(image, hostport, sname, fresh, adaptive):
+    """Return the cache keys of the tests of the suite, and their cached result lines if all of them are cached (or None)"""
+    keys = {test_id: result_cache_key(image, hostport, sname, test_id, adaptive) for test_id in testsuites.testcases(sname)}
+    lines = [result_cache.get(key) for key in keys.values()] if image and not fresh else []
+    return keys, lines if lines and all(lines) else None
+
+
+def record_result(result, hist, recorder, hostport, image, keys):
+    """Add the result to the running latency histogram of its suite, the store, and the cache, and return its result line"""
+    hist.record(result["res"]["timing"]["total"])
+    # The last result of a suite has the whole histogram
+    result["suite_latency"] = hist.dump()
+    recorder.add(hostport, result, student_of(hostport))
+    line = jsonify_result(result)
+    if image:
+        result_cache.put(keys[result["id"]], line)
+    return line
+
+
 @app.route("/")
 def home():
-    return render_template("index.html", test_batches=testsuites.keys(), allowed_members=allowed_members, show_deployer=DEPLOYER, courseid=COURCEID)
+    allowed_members = roster.members
+    # Deployment is only offered once there are members to deploy servers of
+    return render_template("index.html", test_batches=testsuites.keys(), allowed_members=allowed_members, show_deployer=DEPLOYER and bool(allowed_members), courseid=COURCEID)
 
 
-@app.route("/servers/deploy/<csid>", strict_slashes=False, defaults={"gitref": "main"})
-@app.route("/servers/deploy/<csid>/<gitref>")
-def deploy_server(csid, gitref):
-    csid = csid.strip()
-    repo = get_member_repo(csid)
-    if repo is None:
-        return Response(f"User record `{csid}` not present in `{MEMBERSFILE}`.", mimetype="text/plain", status=404)
-
-    msgs = []
+def deploy(job, csid, repo, gitref, rebuild):
+    """Build the image of the student's repo at the gitref (unless asked to skip an existing one) and redeploy its container"""
     contname = f"{COURCEID}-{csid}"
     imgname = f"{COURCEID}/{csid}:{gitref}"
     repo_url = f"{get_authorized_repo_url(repo)}#{gitref}"
 
     buildimg = True
-    if request.args.get("rebuild") == "skip":
+    if rebuild == "skip":
         try:
             client.images.get(imgname)
             buildimg = False
         except Exception as e:
-            msgs.append(f"Image `{imgname}` is not present")
+            job.log(f"Image `{imgname}` is not present")
 
     if buildimg:
         try:
-            gitref = gitref or "main"
-            msgs.append(f"Cloning the `https://github.com/{repo}.git` repo and checking the `{gitref}` branch/tag out")
+            job.log(f"Cloning the `https://github.com/{repo}.git` repo and checking the `{gitref}` branch/tag out")
             res = requests.get(f"https://api.github.com/repos/{repo}/branches/{gitref}", auth=(CREDENTIALS, ""))
             if res.status_code == 200:
                 commit_time = res.json()["commit"]["commit"]["author"]["date"]
-                msgs.append(f"Last commit at: {commit_time}")
+                job.log(f"Last commit at: {commit_time}")
             else:
                 res = requests.get(f"https://api.github.com/repos/{repo}/releases/tags/{gitref}", auth=(CREDENTIALS, ""))
                 if res.status_code == 200:
                     release_time = res.json()["published_at"]
-                    msgs.append(f"Released at: {release_time}")
+                    job.log(f"Released at: {release_time}")
         except Exception as e:
-            msgs.append(f"Failed to fetch last commit/release time of `{gitref}` branch/tag")
+            job.log(f"Failed to fetch last commit/release time of `{gitref}` branch/tag")
         try:
-            img, logs = client.images.build(path=repo_url, tag=imgname, forcerm=True)
-            msgs.append("".join([l.get("stream", "") for l in logs]))
+            # The low-level API streams the build output as it is produced
+            for chunk in client.api.build(path=repo_url, tag=imgname, forcerm=True, decode=True):
+                if "error" in chunk:
+                    raise docker.errors.BuildError(chunk["error"], [])
+                if chunk.get("stream"):
+                    job.log(chunk["stream"].rstrip("\n"))
         except Exception as e:
-            msgs.append(str(e).replace(CREDENTIALS + '@', ''))
-            msgs.append(f"Building image `{imgname}` failed")
-            msgs.append("Ensure that the repo is accessible and contains a valid `Dockerfile`")
-            return Response("\n".join(msgs), mimetype="text/plain", status=500)
+            job.log(str(e).replace(CREDENTIALS + '@', ''))
+            job.log(f"Building image `{imgname}` failed")
+            job.log("Ensure that the repo is accessible and contains a valid `Dockerfile`")
+            return False
     else:
-        msgs.append(f"Reusing existing image `{imgname}` to redeploy the service")
+        job.log(f"Reusing existing image `{imgname}` to redeploy the service")
 
     try:
         client.containers.get(contname).remove(v=True, force=True)
-        msgs.append("Related existing container removed")
+        job.log("Related existing container removed")
     except Exception as e:
         pass
 
     try:
         client.containers.run(imgname, detach=True, network=COURCEID, name=contname)
-        msgs.append(f"A new container is created and the server `{contname}` is deployed successfully")
+        job.log(f"A new container is created and the server `{contname}` is deployed successfully")
     except Exception as e:
-        msgs.append(str(e))
-        msgs.append("Service deployment failed")
-        return Response("\n".join(msgs), mimetype="text/plain", status=500)
+        job.log(str(e))
+        job.log("Service deployment failed")
+        return False
 
-    return Response("\n".join(msgs), mimetype="text/plain", status=200)
+    readiness = HTTPTester(contname).wait_ready(DEPLOY_READY_TIMEOUT)
+    if readiness["ready"]:
+        job.log(f"Server `{contname}` is ready, it started accepting connections in {readiness['time_to_ready']:.2f} seconds")
+    else:
+        job.log(f"Server `{contname}` is not accepting connections after {DEPLOY_READY_TIMEOUT:.0f} seconds, it may still be starting up: {readiness['error']}")
+    return True
 
 
-@app.route("/servers/destroy/<csid>", strict_slashes=False)
-def server_destroy(csid):
+def job_status(job):
+    status = job.status()
+    status["position"] = deploy_jobs.position(job)
+    return status
+
+
+@app.route("/servers/deploy/<csid>", strict_slashes=False, defaults={"gitref": "main"})
+@app.route("/servers/deploy/<csid>/<gitref>")
+def deploy_server(csid, gitref):
     csid = csid.strip()
     repo = get_member_repo(csid)
     if repo is None:
-        return Response(f"Unrecognized student `{csid}`.", mimetype="text/plain", status=404)
+        return Response(f"User record `{csid}` not present in `{MEMBERSFILE}`.", mimetype="text/plain", status=404)
 
-    contname = f"{COURCEID}-{csid}"
+    gitref = gitref or "main"
+    rebuild = request.args.get("rebuild")
     try:
-        client.containers.get(contname).remove(v=True, force=True)
-        return Response(f"Server `{contname}` destroyed successfully.", mimetype="text/plain", status=200)
-    except Exception as e:
-        return Response(f"Server `{contname}` does not exist.", mimetype="text/plain", status=404)
+        job, duplicate = deploy_jobs.submit((csid, gitref, rebuild), csid, deploy, csid, repo, gitref, rebuild)
+    except OverflowError as e:
+        return Response(f"{e}", mimetype="text/plain", status=503)
+
+    if request.args.get("wait"):
+        # Block until the job is done and respond with its logs, like deployments used to
+        job.wait()
+        return Response("\n".join(job.logs), mimetype="text/plain", status=200 if job.state == "succeeded" else 500)
+    status = job_status(job)
+    status["duplicate"] = duplicate
+    return Response(json.dumps(status), mimetype="application/json", status=202)
 
 
-@app.route("/servers/logs/<csid>", strict_slashes=False)
-def server_logs(csid):
+@app.route("/jobs/<job_id>", strict_slashes=False)
+def deploy_job_status(job_id):
+    job = deploy_jobs.get(job_id)
+    if job is None:
+        return Response(f"Job `{job_id}` does not exist.", mimetype="text/plain", status=404)
+    return Response(json.dumps(job_status(job)), mimetype="application/json")
+
+
+@app.route("/servers/destroy/<csid>", strict_slashes=False)
+def server_destroy(csid):
     csid = csid.strip()
     repo = get_member_repo(csid)
     if repo is None:
@@ -173,8 +315,8 @@ def server_logs(csid):
 
     contname = f"{COURCEID}-{csid}"
     try:
-        cont = client.containers.get(contname)
-        return Response(cont.logs(stream=True), mimetype="text/plain")
+        client.containers.get(contname).remove(v=True, force=True)
+        return Response(f"Server `{contname}` destroyed successfully.", mimetype="text/plain", status=200)
     except Exception as e:
         return Response(f"Server `{contname}` does not exist.", mimetype="text/plain", status=404)
 
@@ -189,39 +331,210 @@ def run_test(hostport, suiteid, tid):
     try:
         suite = testsuites[suiteid.lower()]
     except KeyError as e:
-        Response(f"{e}", status=404)
+        return Response(f"{e}", status=404)
     try:
         t = suite(hostport)
     except ValueError as e:
         return Response(f"{e}", status=400)
+    if request.args.get("adaptive"):
+        t.calibrate_timeouts()
     test_id = f"test_{tid}"
-    try:
-        result = t.run_single_test(test_id)
-        return Response(jsonify_result(result), mimetype="application/json")
-    except Exception as e:
-        return Response(f"{e}", status=404)
+    image = deployed_image(hostport)
+    key = result_cache_key(image, t.hostport, suiteid.lower(), test_id, request.args.get("adaptive"))
+    line = result_cache.get(key) if image and not request.args.get("fresh") else None
+    if not line:
+        try:
+            result = t.run_single_test(test_id)
+        except Exception as e:
+            return Response(f"{e}", status=404)
+        with store.recorder("server") as recorder:
+            recorder.add(hostport, result, student_of(hostport))
+        line = jsonify_result(result)
+        if image:
+            result_cache.put(key, line)
+    if request.args.get("compact"):
+        line = compact_result_line(line)
+    return Response(line, mimetype="application/json")
+
+
+@app.route("/payloads/<result_id>")
+def result_payload(result_id):
+    entry = payload_cache.get(result_id)
+    if entry is None:
+        return Response(f"Payload of result `{result_id}` is no longer available, rerun the test with `?fresh=1` to get it again.", mimetype="text/plain", status=404)
+    payload, ctype = entry
+    # Payloads come from the tested servers, they are not trusted to run anything in the origin of this app
+    headers = {"Content-Security-Policy": "sandbox", "X-Content-Type-Options": "nosniff", "Content-Length": str(len(payload))}
+    if isinstance(payload, SpooledPayload):
+        payload = (bytes(block) for block in payload.blocks())
+    return Response(payload, content_type=ctype or "application/octet-stream", headers=headers)
+
+
+@app.route("/results/<target>", strict_slashes=False)
+def latest_results(target):
+    return Response(json.dumps(store.latest_results(target, request.args.get("suite"))), mimetype="application/json")
+
 
+@app.route("/results/<target>/<suiteid>/test_<tid>")
+def test_history(target, suiteid, tid):
+    return Response(json.dumps(store.test_history(target, suiteid.lower(), f"test_{tid}", request.args.get("limit", 100, type=int))), mimetype="application/json")
 
-@app.route("/tests/<hostport>", strict_slashes=False, defaults={"suiteid": ""})
-@app.route("/tests/<hostport>/<suiteid>")
-def run_tests(hostport, suiteid):
-    suiteid = suiteid.lower()
+
+@app.route("/runs", strict_slashes=False)
+def recent_runs():
+    return Response(json.dumps(store.recent_runs(request.args.get("target"), request.args.get("limit", 100, type=int))), mimetype="application/json")
+
+
+async def stream_tests(scope, send, hostport, suiteid):
+    """Stream results of a test suite (or all of them) from the event loop without holding a thread per stream"""
+    loop = asyncio.get_running_loop()
+    args = urllib.parse.parse_qs(scope["query_string"].decode())
+
+    async def respond(status, body):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": body})
+
+    suiteid = (suiteid or "").lower()
     try:
         t = HTTPTester(hostport)
     except ValueError as e:
-        return Response(f"{e}", status=400)
+        return await respond(400, f"{e}".encode())
     if suiteid and suiteid not in testsuites:
-        return Response(f"Test suite `{suiteid}` not implemented", status=404)
+        return await respond(404, f"Test suite `{suiteid}` not implemented".encode())
     suites = {suiteid: testsuites[suiteid]} if suiteid else testsuites
-
-    def generate():
-        for _, suite in suites.items():
+    # Timeouts are adapted to the server once per run, if asked to
+    calibration = await loop.run_in_executor(test_executor, t.calibrate_timeouts) if args.get("adaptive") else None
+    # Results are reused while the same image is deployed, unless fresh ones are asked for
+    image = await loop.run_in_executor(test_executor, deployed_image, hostport)
+    target = t.hostport
+    fresh = args.get("fresh")
+    # Tests of a server that stops accepting connections fail fast
+    breaker = CircuitBreaker()
+    compact = args.get("compact")
+    gzip = accepts_gzip(dict(scope["headers"]).get(b"accept-encoding", b"").decode())
+    encode, finish = line_encoder(gzip)
+
+    async def send_line(line):
+        await send({"type": "http.response.body", "body": encode(compact_result_line(line) if compact else line), "more_body": True})
+
+    headers = [(b"content-type", b"application/ors"), (b"vary", b"Accept-Encoding")] + ([(b"content-encoding", b"gzip")] if gzip else [])
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    # Storing and encoding results block, the recorder is used by one worker thread at a time as its calls are awaited in turn
+    recorder = await loop.run_in_executor(test_executor, functools.partial(store.recorder, "server", check_same_thread=False))
+    try:
+        for sname, suite in suites.items():
+            keys, lines = cached_suite_lines(image, target, sname, fresh, calibration)
+            if lines:
+                for line in lines:
+                    await send_line(line)
+                continue
             t = suite(hostport)
-            for result in t.run_all_tests():
-                yield jsonify_result(result)
+            t.breaker = breaker
+            if calibration:
+                t.apply_calibration(calibration)
+            hist = Histogram()
+            # Long waiting tests overlap with the rest, which run one at a time like they do in run_all_tests
+            # Closing the results right away (e.g., when the client goes away) cancels the remaining tests
+            async with contextlib.aclosing(t.arun_all_tests(len(t.long_wait_tests()) + 1, test_executor)) as results:
+                async for result in results:
+                    await send_line(await loop.run_in_executor(test_executor, record_result, result, hist, recorder, hostport, image, keys))
+    finally:
+        await loop.run_in_executor(test_executor, recorder.close)
+    await send({"type": "http.response.body", "body": finish()})
+
+
+async def respond_text(send, status, text):
+    await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+    await send({"type": "http.response.body", "body": text.encode()})
+
+
+async def stream_chunks(send, chunks, close=None):
+    """Stream the chunks of a blocking iterator as a plain text response, skipping empty ones.
+    Each chunk is pulled in a thread of this stream alone, so endless streams (e.g., logs) do not use up a shared pool of threads.
+    The close function (e.g., of a stream that can be closed from another thread) unblocks the pending pull when streaming stops early."""
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if close:
+            close()
+        executor.shutdown(wait=False)
+
+
+async def stream_job_logs(scope, send, job_id):
+    """Stream the log of a deploy job until the job is done"""
+    job = deploy_jobs.get(job_id)
+    if job is None:
+        return await respond_text(send, 404, f"Job `{job_id}` does not exist.")
+    # The follower wakes up every second nothing is logged, so its thread does not outlive a client that went away for long
+    await stream_chunks(send, (f"{line}\n".encode() if line is not None else b"" for line in job.follow(timeout=1)))
+
+
+async def stream_server_logs(scope, send, csid):
+    """Stream the log of a deployed server for as long as the client reads it"""
+    loop = asyncio.get_running_loop()
+    csid = csid.strip()
+    repo = await loop.run_in_executor(test_executor, get_member_repo, csid)
+    if repo is None:
+        return await respond_text(send, 404, f"Unrecognized student `{csid}`.")
+
+    contname = f"{COURCEID}-{csid}"
+    try:
+        cont = await loop.run_in_executor(test_executor, client.containers.get, contname)
+        logs = await loop.run_in_executor(test_executor, functools.partial(cont.logs, stream=True))
+    except Exception as e:
+        return await respond_text(send, 404, f"Server `{contname}` does not exist.")
+    await stream_chunks(send, logs, logs.close)
+
+
+async def until_disconnected(receive):
+    """Wait until the client of an ASGI request goes away (or its response is complete)"""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def unless_disconnected(receive, streaming):
+    """Run the coroutine that streams a response, cancelling it as soon as the client goes away.
+    ASGI servers silently drop what is sent after that, so the response would otherwise keep being produced until its end."""
+    streaming = asyncio.ensure_future(streaming)
+    disconnected = asyncio.ensure_future(until_disconnected(receive))
+    try:
+        await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        streaming.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await streaming
+
+
+wsgi_app = WSGIMiddleware(app, workers=WSGI_WORKERS)
+# Long running streams are served on the event loop, so they do not use up the threads of the WSGI app
+STREAM_ROUTES = [
+    (re.compile("/tests/(?P<hostport>[^/]+)(/(?P<suiteid>[^/]*))?"), stream_tests),
+    (re.compile("/jobs/(?P<job_id>[^/]+)/logs/?"), stream_job_logs),
+    (re.compile("/servers/logs/(?P<csid>[^/]+)/?"), stream_server_logs),
+]
+
 
-    return Response(generate(), mimetype="application/ors")
+async def asgi_app(scope, receive, send):
+    """ASGI entry point that serves streams (of test results and logs) on the event loop and hands everything else over to the Flask app"""
+    if scope["type"] == "http" and scope["method"] == "GET":
+        for path, handler in STREAM_ROUTES:
+            m = path.fullmatch(scope["path"])
+            if m:
+                return await unless_disconnected(receive, handler(scope, send, **m.groupdict()))
+    return await wsgi_app(scope, receive, send)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port="5000")
+    uvicorn.run(asgi_app, host="0.0.0.0", port=5000, lifespan="off")
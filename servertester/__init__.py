@@ -0,0 +1,23 @@
+import os
+import hashlib
+import functools
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=None)
+def tester_version():
+    """Short digest of the tester sources and message files, which changes whenever any of them does"""
+    hasher = hashlib.sha256()
+    for top in ["servertester", "messages"]:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT_DIR, top)):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith((".", "__")))
+            for fname in sorted(filenames):
+                if fname.startswith(".") or fname.endswith(".pyc"):
+                    continue
+                fpath = os.path.join(dirpath, fname)
+                hasher.update(os.path.relpath(fpath, ROOT_DIR).encode())
+                with open(fpath, "rb") as f:
+                    hasher.update(f.read())
+    return hasher.hexdigest()[:12]
@@ -0,0 +1,119 @@
+import time
+import random
+import threading
+import collections
+
+from .histogram import Histogram
+
+
+class Bench():
+    """Bench drives a message template against a server at a target request rate or concurrency for a fixed duration.
+    With a target rate, requests are scheduled open-loop and their latencies are measured from when they were due to be sent,
+    so that a server that stalls the load generator is not credited with the requests it delayed (i.e., coordinated omission)."""
+
+    def __init__(self, tester, msg_file, rate=None, concurrency=8, duration=10.0, keep_alive=False, sample=0.0, checks=None, **kwargs):
+        """Initialize a Bench of the msg_file template rendered with the kwargs placeholders for the server of the tester.
+        A sample fraction of responses is validated with the checks, a list of (check_* helper name, args) tuples."""
+        self.tester = tester
+        self.msg_file = msg_file
+        self.rate = rate
+        self.concurrency = concurrency
+        self.duration = duration
+        self.keep_alive = keep_alive
+        self.sample = sample
+        self.checks = checks or []
+        self.kwargs = kwargs
+        self.lock = threading.Lock()
+        self.count = 0
+        self.latencies = Histogram()
+        self.errors = collections.Counter()
+        self.validated = 0
+        self.failures = collections.Counter()
+
+
+    def next_due(self):
+        """Return the time the next request is due to be sent, or None if the duration is over"""
+        with self.lock:
+            if self.rate:
+                due = self.started + self.count / self.rate
+            else:
+                due = time.monotonic()
+            if due >= self.started + self.duration:
+                return None
+            self.count += 1
+            return due
+
+
+    def validate(self, report):
+        """Run the checks on the response and return the first failed assertion message (or error of a check), if any"""
+        try:
+            for name, args in self.checks:
+                getattr(self.tester, f"check_{name}")(report, *args)
+        except AssertionError as e:
+            return str(e)
+        except Exception as e:
+            # A check that can not handle the response fails it instead of stopping the worker
+            return f"Check `{name}` failed: {type(e).__name__}: {e}"
+
+
+    def worker(self):
+        t = self.tester.clone()
+        # Stop reading as soon as responses are framed instead of waiting for any extra data
+        t.RECV_LINGER_TIMEOUT = 0
+        # Latencies are recorded per worker and merged in the end
+        latencies = Histogram()
+        due = self.next_due()
+        while due is not None:
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sent = time.monotonic()
+            report = t.netcat(self.msg_file, keep_alive=self.keep_alive, **self.kwargs)
+            if report["res"]["connection"] != "alive" or report["errors"]:
+                t.reset_sock()
+            latencies.record(sent - due + (report["res"]["timing"]["total"] or time.monotonic() - sent))
+            failure = None
+            validated = not report["errors"] and random.random() < self.sample
+            if validated:
+                failure = self.validate(report)
+            with self.lock:
+                if report["errors"]:
+                    self.errors[report["errors"][0]] += 1
+                self.validated += validated
+                if failure:
+                    self.failures[failure] += 1
+            due = self.next_due()
+        t.reset_sock()
+        with self.lock:
+            self.latencies.merge(latencies)
+
+
+    def run(self):
+        """Run the benchmark and return its stats"""
+        self.started = time.monotonic()
+        workers = [threading.Thread(target=self.worker, daemon=True) for _ in range(self.concurrency)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        return self.stats(time.monotonic() - self.started)
+
+
+    def stats(self, elapsed):
+        count = len(self.latencies)
+        errors = sum(self.errors.values())
+        percentiles = {f"p{p}": v for p, v in self.latencies.percentiles(50, 90, 99, 99.9).items()}
+        percentiles["max"] = self.latencies.maximum()
+        return {
+            "requests": count,
+            "elapsed": elapsed,
+            "throughput": count / elapsed if elapsed else 0,
+            "errors": errors,
+            "error_rate": errors / count if count else 0,
+            "top_errors": self.errors.most_common(5),
+            "latency": percentiles,
+            "histogram": self.latencies.dump(),
+            "validated": self.validated,
+            "failures": sum(self.failures.values()),
+            "top_failures": self.failures.most_common(5)
+        }
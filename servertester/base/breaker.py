@@ -0,0 +1,46 @@
+import time
+import threading
+
+
+class CircuitBreaker():
+    """CircuitBreaker stops connection attempts to a server once a number of consecutive ones failed, so tests of a dead server fail fast.
+    An open circuit lets a single probe through after a cooldown (half-open), it closes again if the probe connects."""
+
+    def __init__(self, threshold=3, cooldown=2.0):
+        """Initialize a CircuitBreaker that opens after threshold consecutive connection failures and probes again after cooldown seconds"""
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.circuits = {}
+        self.lock = threading.Lock()
+        self.short_circuits = 0
+
+
+    def allow(self, host, port):
+        """Return whether a connection to the server may be attempted, counting the ones that may not"""
+        with self.lock:
+            circuit = self.circuits.get((host, port))
+            if not circuit or circuit["opened"] is None:
+                return True
+            if not circuit["probing"] and time.monotonic() - circuit["opened"] >= self.cooldown:
+                circuit["probing"] = True
+                return True
+            self.short_circuits += 1
+            return False
+
+
+    def record(self, host, port, connected):
+        """Record the outcome of a connection attempt to the server, opening the circuit if the failures add up (or the probe failed)"""
+        with self.lock:
+            circuit = self.circuits.setdefault((host, port), {"failures": 0, "opened": None, "probing": False})
+            if connected:
+                circuit.update(failures=0, opened=None, probing=False)
+                return
+            circuit["failures"] += 1
+            if circuit["probing"] or circuit["failures"] >= self.threshold:
+                circuit.update(opened=time.monotonic(), probing=False)
+
+
+    def is_open(self, host, port):
+        with self.lock:
+            circuit = self.circuits.get((host, port))
+            return bool(circuit and circuit["opened"] is not None)
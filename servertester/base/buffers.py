@@ -0,0 +1,311 @@
+import os
+import re
+import hashlib
+import tempfile
+
+
+HEADER_END = re.compile(b"\r?\n\r?\n")
+
+
+class ReceiveBuffer():
+    """ReceiveBuffer is a growable byte buffer that is filled in place from sockets without intermediate copies.
+    Data beyond the spool_size is spooled to a temporary file while the payload size, digest, and tail are tracked on the fly."""
+
+    def __init__(self, size=65536, spool_size=None, preview_size=65536):
+        """Initialize a ReceiveBuffer with the initial capacity of size bytes that keeps at most spool_size bytes in memory"""
+        self.data = bytearray(size)
+        self.length = 0
+        self.memory = 0
+        self.spool_size = spool_size
+        self.preview_size = preview_size
+        self.spool = None
+        self.hasher = None
+        self.tail = b""
+        # Offset where the last message starts (kept up to date by a framer) and where the payload digest starts
+        self.message_start = 0
+        self.digest_start = None
+
+
+    def reserve(self, n):
+        """Ensure that there is room for at least n more bytes, growing the capacity geometrically"""
+        if len(self.data) - self.memory < n:
+            grow = max(len(self.data), n)
+            if self.spool_size is not None:
+                grow = max(min(grow, self.spool_size - len(self.data)), n)
+            self.data.extend(bytes(grow))
+
+
+    def room(self):
+        return float("inf") if self.spool_size is None else self.spool_size - self.memory
+
+
+    def recv_into(self, sock, n=65536):
+        """Receive up to n bytes from the socket directly at the end of the buffer (or the spool) and return the number of bytes read"""
+        if self.spool is None and self.room() > 0:
+            n = min(n, self.room())
+            self.reserve(n)
+            with memoryview(self.data)[self.memory:self.memory + n] as mv:
+                count = sock.recv_into(mv)
+            self.memory += count
+            self.length += count
+            return count
+        data = sock.recv(n)
+        self.spill(data)
+        return len(data)
+
+
+    def write(self, data):
+        """Append data (e.g., from a stream reader that does not support reading into a buffer)"""
+        n = min(len(data), self.room()) if self.spool is None else 0
+        if n:
+            self.reserve(n)
+            self.data[self.memory:self.memory + n] = data[:n]
+            self.memory += n
+            self.length += n
+        if n < len(data):
+            self.spill(data[n:])
+
+
+    def spill(self, data):
+        """Write data beyond the in-memory limit to the spool while updating the payload digest and tail preview.
+        The spooled data belongs to the last message, so the digest starts after the end of its headers."""
+        if self.spool is None:
+            self.spool = tempfile.TemporaryFile()
+            m = HEADER_END.search(self.data, self.message_start, self.memory)
+            if m:
+                self.digest_start = m.end()
+                self.hasher = hashlib.sha256(memoryview(self.data)[m.end():self.memory])
+        self.spool.write(data)
+        if self.hasher:
+            self.hasher.update(data)
+        self.tail = (self.tail + data)[-self.preview_size:]
+        self.length += len(data)
+
+
+    def view(self):
+        """Return a memoryview of the in-memory part, the buffer must not grow afterwards"""
+        return memoryview(self.data)[:self.memory]
+
+
+    def spooled_payload(self, head):
+        """Return a SpooledPayload of the in-memory head of the payload followed by the spooled data.
+        The running digest is only used if it started where the head does, otherwise the digest is computed when needed."""
+        hasher = self.hasher if self.memory - len(head) == self.digest_start else None
+        return SpooledPayload(head, self.spool, self.length - self.memory, hasher, self.tail)
+
+
+class PayloadView():
+    """PayloadView is a read-only window into a receive buffer that behaves like bytes.
+    Slicing and prefix/suffix comparisons are zero-copy, the window is materialized (once) only when needed."""
+
+    def __init__(self, data=b""):
+        """Initialize a PayloadView over any bytes-like data"""
+        if isinstance(data, PayloadView):
+            self.view = data.view
+        elif isinstance(data, SpooledPayload):
+            self.view = memoryview(data.tobytes())
+        else:
+            self.view = memoryview(data)
+        self._bytes = None
+
+
+    def tobytes(self):
+        if self._bytes is None:
+            self._bytes = self.view.tobytes()
+        return self._bytes
+
+
+    def __bytes__(self):
+        return self.tobytes()
+
+
+    def blocks(self):
+        yield self.view
+
+
+    def __len__(self):
+        return len(self.view)
+
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return PayloadView(self.view[key])
+        return self.view[key]
+
+
+    def __eq__(self, other):
+        if isinstance(other, PayloadView):
+            other = other.view
+        try:
+            return self.view == memoryview(other)
+        except TypeError:
+            return NotImplemented
+
+
+    __hash__ = None
+
+
+    def __contains__(self, sub):
+        return sub in self.tobytes()
+
+
+    def __repr__(self):
+        return f"PayloadView({self.tobytes()!r})"
+
+
+    def startswith(self, prefix):
+        return len(prefix) <= len(self.view) and self.view[:len(prefix)] == prefix
+
+
+    def endswith(self, suffix):
+        return len(suffix) <= len(self.view) and self.view[len(self.view) - len(suffix):] == suffix
+
+
+    def decode(self, *args, **kwargs):
+        return self.tobytes().decode(*args, **kwargs)
+
+
+    def strip(self, *args):
+        return self.tobytes().strip(*args)
+
+
+    def find(self, *args):
+        return self.tobytes().find(*args)
+
+
+    def sha256(self):
+        return hashlib.sha256(self.view).hexdigest()
+
+
+    def preview(self):
+        return self.tobytes()
+
+
+class SpooledPayload():
+    """SpooledPayload is a large payload with its head in memory and the rest in a temporary file.
+    It behaves like bytes, but scans the spool in blocks instead of loading it in memory where possible.
+    Slices are windows into the same spool file."""
+
+    BLOCK_SIZE = 1048576
+
+    def __init__(self, head, spool, spool_size, hasher, tail, offset=0):
+        """Initialize a SpooledPayload from its in-memory PayloadView head, spool file, spooled size, running digest, and tail preview.
+        The spooled data starts at the offset in the spool file."""
+        self.head = head
+        self.spool = spool
+        self.spool_size = spool_size
+        self.hasher = hasher
+        self.tail = tail
+        self.offset = offset
+
+
+    def read_spool(self, pos, n):
+        """Read n bytes of the spooled data from the position relative to the offset, without moving the file position shared by slices"""
+        return os.pread(self.spool.fileno(), n, self.offset + pos)
+
+
+    def blocks(self):
+        yield self.head.view
+        pos = 0
+        while pos < self.spool_size:
+            block = self.read_spool(pos, min(self.BLOCK_SIZE, self.spool_size - pos))
+            if not block:
+                break
+            yield block
+            pos += len(block)
+
+
+    def tobytes(self):
+        return b"".join(bytes(b) for b in self.blocks())
+
+
+    def __bytes__(self):
+        return self.tobytes()
+
+
+    def __len__(self):
+        return len(self.head) + self.spool_size
+
+
+    def __getitem__(self, key):
+        split = len(self.head)
+        if not isinstance(key, slice):
+            idx = key + len(self) if key < 0 else key
+            if not 0 <= idx < len(self):
+                raise IndexError("index out of range")
+            return self.head[idx] if idx < split else self.read_spool(idx - split, 1)[0]
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            return self.tobytes()[key]
+        stop = max(start, stop)
+        if stop <= split:
+            return self.head[start:stop]
+        skip = max(start - split, 0)
+        size = stop - split - skip
+        tail = self.read_spool(skip + size - min(size, len(self.tail)), min(size, len(self.tail)))
+        return SpooledPayload(self.head[min(start, split):], self.spool, size, None, tail, self.offset + skip)
+
+
+    def __eq__(self, other):
+        if isinstance(other, SpooledPayload):
+            return len(self) == len(other) and self.sha256() == other.sha256()
+        try:
+            other = memoryview(other)
+        except TypeError:
+            return NotImplemented
+        return len(self) == len(other) and self.sha256() == hashlib.sha256(other).hexdigest()
+
+
+    __hash__ = None
+
+
+    def __contains__(self, sub):
+        # Carry the last few bytes of each block over to find matches across block boundaries
+        carry = b""
+        for block in self.blocks():
+            data = carry + bytes(block)
+            if sub in data:
+                return True
+            carry = data[-len(sub) + 1:] if len(sub) > 1 else b""
+        return False
+
+
+    def __repr__(self):
+        return f"SpooledPayload({len(self)} bytes, sha256={self.sha256()})"
+
+
+    def startswith(self, prefix):
+        if len(prefix) <= len(self.head):
+            return self.head.startswith(prefix)
+        return self.tobytes().startswith(prefix)
+
+
+    def endswith(self, suffix):
+        if len(suffix) <= len(self.tail):
+            return self.tail.endswith(suffix)
+        return self.tobytes().endswith(suffix)
+
+
+    def decode(self, *args, **kwargs):
+        return self.tobytes().decode(*args, **kwargs)
+
+
+    def strip(self, *args):
+        return self.tobytes().strip(*args)
+
+
+    def find(self, *args):
+        return self.tobytes().find(*args)
+
+
+    def sha256(self):
+        if self.hasher:
+            return self.hasher.hexdigest()
+        hasher = hashlib.sha256()
+        for block in self.blocks():
+            hasher.update(block)
+        return hasher.hexdigest()
+
+
+    def preview(self):
+        return self.head.tobytes()
@@ -0,0 +1,53 @@
+import time
+import threading
+import collections
+
+
+class ResultCache():
+    """ResultCache is a thread-safe LRU cache of serialized results (or other values of a known size) with a time to live, bounded by the total size of its values"""
+
+    def __init__(self, ttl=3600, max_size=64 * 1024 * 1024):
+        """Initialize a ResultCache whose entries expire after ttl seconds and whose values take at most max_size bytes in total"""
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+
+    def get(self, key):
+        """Return the value of an unexpired entry of the key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires, size = entry
+            if expires < time.monotonic():
+                self.discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+
+    def put(self, key, value, size=None):
+        """Add or replace the entry of the key, evicting the least recently used entries beyond the size limit.
+        The size of the value is its length, unless given."""
+        size = len(value) if size is None else size
+        if size > self.max_size:
+            return
+        with self.lock:
+            self.discard(key)
+            self.entries[key] = (value, time.monotonic() + self.ttl, size)
+            self.size += size
+            while self.size > self.max_size:
+                self.discard(next(iter(self.entries)))
+
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[2]
+
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,209 @@
+import re
+import time
+
+
+HEADER_END = re.compile(b"\r?\n\r?\n")
+NEWLINE = re.compile(b"\n")
+STATUS_LINE = re.compile(r"^([\w\/\.]+)\s+(\d+)")
+
+
+class ResponseFramer():
+    """ResponseFramer incrementally frames HTTP responses as bytes arrive to know when all the expected responses are complete"""
+
+    def __init__(self, msg, rbuf):
+        """Initialize a ResponseFramer for the (possibly pipelined) request message that was sent.
+        Responses are framed in place as they are received into the rbuf ReceiveBuffer."""
+        self.methods, self.close_requested = self.split_requests(msg)
+        self.rbuf = rbuf
+        self.pos = 0
+        self.start = 0
+        self.first_byte_at = None
+        self.headers_at = None
+        self.now = None
+        self.spans = []
+        self.count = 0
+        self.body_end = None
+        self.chunk_pos = None
+        self.decoder = None
+        self.until_close = False
+        self.close_expected = self.close_requested
+        self.complete = not self.methods
+
+
+    def split_requests(self, msg):
+        """Return methods of all the requests in a raw message and whether any of them asks to close the connection"""
+        methods = []
+        close_requested = False
+        pos = 0
+        while msg[pos:].strip():
+            m = HEADER_END.search(msg, pos)
+            end = m.start() if m else len(msg)
+            lines = msg[pos:end].decode("latin-1").strip().replace("\r", "").split("\n")
+            methods.append(lines[0].split(" ")[0].upper())
+            cl = 0
+            for line in lines[1:]:
+                k, sep, v = line.partition(":")
+                k = k.strip().lower()
+                if k == "connection" and "close" in v.lower():
+                    close_requested = True
+                elif k == "content-length":
+                    try:
+                        cl = int(v)
+                    except ValueError:
+                        pass
+            if lines[0].rstrip().endswith("HTTP/1.0"):
+                close_requested = True
+            if not m:
+                break
+            pos = m.end() + cl
+        return methods, close_requested
+
+
+    def feed(self):
+        """Consume newly received bytes and return whether all the expected responses are complete.
+        Each framed response is recorded in spans as its (start, end, first byte arrival time, completion time)."""
+        self.now = time.monotonic()
+        while not self.complete and not self.until_close:
+            if self.first_byte_at is None and self.rbuf.length > self.start:
+                self.first_byte_at = self.now
+            if not self.frame_next():
+                break
+            self.complete = self.count >= len(self.methods)
+        return self.complete
+
+
+    def frame_next(self):
+        """Try to frame the response starting at the current position and advance past it if complete"""
+        buf, end = self.rbuf.data, self.rbuf.memory
+        if self.body_end is None:
+            if self.rbuf.spool and self.pos >= end:
+                # The next response starts in the spool, which is not framed
+                self.until_close = True
+                return False
+            m = HEADER_END.search(buf, self.pos, end)
+            if not m:
+                return False
+            if self.headers_at is None:
+                self.headers_at = self.now
+            lines = buf[self.pos:m.start()].decode("latin-1").lstrip().replace("\r", "").split("\n")
+            status = STATUS_LINE.match(lines[0])
+            if not status:
+                self.until_close = True
+                return False
+            version, code = status[1], int(status[2])
+            headers = {}
+            for line in lines[1:]:
+                k, sep, v = line.partition(":")
+                if sep:
+                    headers[k.strip().lower()] = v.strip().lower()
+            if 100 <= code < 200 and code != 101:
+                self.pos = m.end()
+                return True
+            if "close" in headers.get("connection", "") or (version == "HTTP/1.0" and "keep-alive" not in headers.get("connection", "")):
+                self.close_expected = True
+            if self.methods[self.count] == "HEAD" or code in (204, 304):
+                self.body_end = m.end()
+            elif headers.get("transfer-encoding", "").endswith("chunked"):
+                self.decoder = ChunkedDecoder(keep_body=False)
+                self.chunk_pos = m.end()
+                self.body_end = -1
+            elif "content-length" in headers:
+                try:
+                    self.body_end = m.end() + int(headers["content-length"])
+                except ValueError:
+                    self.until_close = True
+                    return False
+            else:
+                self.until_close = True
+                return False
+        if self.chunk_pos is not None:
+            try:
+                self.chunk_pos = self.decoder.feed(buf, self.chunk_pos, end)
+            except ValueError:
+                self.until_close = True
+                return False
+            if not self.decoder.done:
+                # Chunks spooled beyond the in-memory data are not framed
+                self.until_close = self.rbuf.spool is not None
+                return False
+            self.body_end = self.chunk_pos
+            self.chunk_pos = None
+        if self.body_end > self.rbuf.length:
+            return False
+        self.spans.append((self.start, self.body_end, self.first_byte_at, self.now))
+        self.pos = self.start = self.rbuf.message_start = self.body_end
+        self.body_end = None
+        self.first_byte_at = None
+        self.count += 1
+        return True
+
+
+class ChunkedDecoder():
+    """ChunkedDecoder is an incremental state machine to decode chunked transfer-coding as bytes arrive"""
+
+    def __init__(self, keep_body=True):
+        """Initialize a ChunkedDecoder, the decoded body is accumulated only if keep_body is set"""
+        self.body = bytearray() if keep_body else None
+        self.trailers = []
+        self.state = "size"
+        self.remaining = 0
+
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+
+    def feed(self, buf, pos=0, end=None):
+        """Decode as much of the bytes-like buf from pos (up to end) as available and return the position up to which it is consumed.
+        Incomplete lines are left unconsumed to be fed again along with more data."""
+        end = len(buf) if end is None else end
+        while self.state != "done":
+            if self.state == "size":
+                m = NEWLINE.search(buf, pos, end)
+                if not m:
+                    return pos
+                eol = m.start()
+                chdesc = bytes(buf[pos:eol + 1])
+                try:
+                    self.remaining = int(chdesc.split(b";")[0].strip(), 16)
+                except ValueError:
+                    cd = chdesc.decode("latin-1").strip("\r\n")
+                    raise ValueError(f"Chunk descriptor `{cd}` must begin with a Hexadecimal number")
+                pos = eol + 1
+                self.state = "data" if self.remaining else "trailer"
+            elif self.state == "data":
+                n = min(self.remaining, end - pos)
+                if self.body is not None:
+                    with memoryview(buf) as mv:
+                        self.body += mv[pos:pos + n]
+                pos += n
+                self.remaining -= n
+                if self.remaining:
+                    return pos
+                self.state = "data_end"
+            elif self.state == "data_end":
+                if end - pos < 2:
+                    return pos
+                if buf[pos:pos + 2] != b"\r\n":
+                    raise ValueError("Chunk is not terminated with a `CRLF`")
+                pos += 2
+                self.state = "size"
+            elif self.state == "trailer":
+                m = NEWLINE.search(buf, pos, end)
+                if not m:
+                    return pos
+                eol = m.start()
+                line = bytes(buf[pos:eol + 1])
+                pos = eol + 1
+                if line.strip():
+                    self.trailers.append(line.decode("latin-1").strip())
+                else:
+                    self.state = "done"
+        return pos
+
+
+    def finish(self):
+        """Signal the end of input, which is only acceptable outside of a chunk"""
+        if self.state in ("data", "data_end"):
+            raise ValueError("Chunk is not terminated with a `CRLF`")
@@ -0,0 +1,157 @@
+import math
+import zlib
+import base64
+
+
+class Histogram():
+    """Histogram is a log-bucketed (HDR-style) latency recorder with a bounded number of buckets for any number of samples.
+    Values are recorded with the given significant decimal digits of precision, instances with the same settings are mergeable.
+    Recording is not thread-safe, use one instance per thread (or process) and merge them."""
+
+    def __init__(self, unit=1e-6, precision=2):
+        """Initialize a Histogram of values (e.g., seconds) that are recorded as integer multiples of the unit"""
+        self.unit = unit
+        self.precision = precision
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** precision))
+        self.sub_count = 1 << self.sub_bits
+        self.half = self.sub_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+
+    def index(self, v):
+        """Return the bucket index of an integer value, buckets are exact below sub_count and double in width at every power of two after"""
+        if v < self.sub_count:
+            return v
+        shift = v.bit_length() - self.sub_bits
+        return shift * self.half + (v >> shift)
+
+
+    def bounds(self, i):
+        """Return the lowest and the highest integer values of the bucket at index i"""
+        if i < self.sub_count:
+            return i, i
+        shift = i // self.half - 1
+        lowest = (i - shift * self.half) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+
+    def record(self, value, n=1):
+        """Record n occurrences of the value"""
+        v = max(int(round(value / self.unit)), 0)
+        i = self.index(v)
+        self.counts[i] = self.counts.get(i, 0) + n
+        self.count += n
+        self.total += v * n
+        self.min = v if self.min is None else min(self.min, v)
+        self.max = v if self.max is None else max(self.max, v)
+
+
+    def merge(self, other):
+        """Add all the samples of the other histogram to this one"""
+        if (self.unit, self.precision) != (other.unit, other.precision):
+            raise ValueError("Histograms with different units or precisions can not be merged")
+        for i, n in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + n
+        self.count += other.count
+        self.total += other.total
+        for v in [other.min, other.max]:
+            if v is not None:
+                self.min = v if self.min is None else min(self.min, v)
+                self.max = v if self.max is None else max(self.max, v)
+        return self
+
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def percentile(self, p):
+        """Return the value below which p percent of the samples fall (within the precision), or None if empty"""
+        if not self.count:
+            return None
+        target = max(math.ceil(self.count * p / 100), 1)
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= target:
+                return min(max(self.bounds(i)[1], self.min), self.max) * self.unit
+        return self.max * self.unit
+
+
+    def percentiles(self, *ps):
+        return {p: self.percentile(p) for p in ps}
+
+
+    def mean(self):
+        return self.total / self.count * self.unit if self.count else None
+
+
+    def minimum(self):
+        return None if self.min is None else self.min * self.unit
+
+
+    def maximum(self):
+        return None if self.max is None else self.max * self.unit
+
+
+    def encode_counts(self):
+        """Encode bucket counts as zlib compressed varints of index gaps and counts, in base64"""
+        data = bytearray()
+        prev = 0
+        for i in sorted(self.counts):
+            for v in [i - prev, self.counts[i]]:
+                while v >= 0x80:
+                    data.append(v & 0x7f | 0x80)
+                    v >>= 7
+                data.append(v)
+            prev = i
+        return base64.b64encode(zlib.compress(bytes(data))).decode()
+
+
+    def decode_counts(self, encoded):
+        data = zlib.decompress(base64.b64decode(encoded))
+        values = []
+        v = shift = 0
+        for b in data:
+            v |= (b & 0x7f) << shift
+            shift += 7
+            if not b & 0x80:
+                values.append(v)
+                v = shift = 0
+        i = 0
+        for gap, n in zip(values[::2], values[1::2]):
+            i += gap
+            self.counts[i] = n
+
+
+    def dump(self):
+        """Return a compact JSON serializable dict of the histogram"""
+        return {
+            "unit": self.unit,
+            "precision": self.precision,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "counts": self.encode_counts()
+        }
+
+
+    @classmethod
+    def load(cls, obj):
+        """Return a Histogram from the dict returned by dump"""
+        h = cls(obj["unit"], obj["precision"])
+        h.decode_counts(obj["counts"])
+        h.count = obj["count"]
+        h.total = obj["total"]
+        h.min = obj["min"]
+        h.max = obj["max"]
+        return h
@@ -1,5 +1,4 @@
 import os
-import io
 import re
 import time
 import random
@@ -7,11 +6,43 @@ import inspect
 import collections
 import functools
 import socket
+import copy
+import asyncio
+import contextlib
+import concurrent.futures
+
+from .framing import ResponseFramer, ChunkedDecoder
+from .template import load_template
+from .buffers import ReceiveBuffer, PayloadView, SpooledPayload
 
 
 class HTTPTester():
     """HTTPTester is a generic HTTP server tester base class that can be inherited to write test cases for specific web servers"""
 
+    # Ordered metadata of all the test cases, built once per class when it is created
+    TESTCASES = {}
+
+    def __init_subclass__(cls, **kwargs):
+        """Build the ordered test case registry of a suite class from its test_* functions"""
+        super().__init_subclass__(**kwargs)
+        tfuncs = [f for f in inspect.getmembers(cls, inspect.isfunction) if f[0].startswith("test_")]
+        registry = []
+        for fname, func in tfuncs:
+            orig = getattr(func, "__wrapped__", func)
+            msg_file, params = getattr(func, "__request__", (None, {}))
+            registry.append({
+                "id": fname,
+                "description": func.__doc__,
+                "line": orig.__code__.co_firstlineno,
+                "msg_file": msg_file,
+                "params": params,
+                "serial": getattr(func, "__serial__", False),
+                "long_wait": getattr(func, "__long_wait__", False),
+                # Tests of connection lifecycle never reuse a pooled connection
+                "fresh_connection": bool(getattr(func, "__fresh_connection__", False) or getattr(func, "__long_wait__", False) or params.get("keep_alive") or {"check_connection_alive", "check_connection_closed"}.intersection(orig.__code__.co_names))
+            })
+        cls.TESTCASES = {meta["id"]: meta for meta in sorted(registry, key=lambda x: x["line"])}
+
     def __init__(self, hostport="localhost:80"):
         """Initialize a HTTPTester instance for a server specified by the hostport"""
 
@@ -28,8 +59,32 @@ class HTTPTester():
         self.SEND_DATA_TIMEOUT = 3.0
         self.RECV_FIRST_BYTE_TIMEOUT = 1.0
         self.RECV_END_TIMEOUT = 0.5
+        # Zero linger stops reading as soon as all the responses are framed (e.g., for benchmarking)
+        self.RECV_LINGER_TIMEOUT = 0.05
         self.LIFETIME_TIMEOUT = 5
 
+        # Calibration of socket timeouts from round trip times of probes, bounded by (floor, ceiling) of each timeout
+        # Probes are trivial requests that only measure the network, while slower responses (e.g., CGI or directory listings) and gaps within
+        # response bodies are not probed, so read timeouts never drop below their defaults, they only grow for slow networks
+        self.CALIBRATION_PROBES = 5
+        self.CALIBRATION_RTT_FACTOR = 10
+        self.CALIBRATION_BOUNDS = {
+            "CONNECTION_TIMEOUT": (0.05, 3.0),
+            "RECV_FIRST_BYTE_TIMEOUT": (1.0, 5.0),
+            "RECV_END_TIMEOUT": (0.5, 3.0),
+            "RECV_LINGER_TIMEOUT": (0.05, 1.0)
+        }
+        self.calibration = None
+
+        # Readiness polling deadline, (initial, maximum) delay between probes that doubles after each one, and optional request template of probes
+        self.READINESS_TIMEOUT = 30.0
+        self.READINESS_BACKOFF = (0.05, 2.0)
+        self.READINESS_MSG_FILE = None
+
+        # Response size limits (bytes beyond the spool size are kept in a temporary file)
+        self.RECV_SPOOL_SIZE = 8 * 1024 * 1024
+        self.RECV_MAX_SIZE = 256 * 1024 * 1024
+
         # Identify host and port of the server to be tested
         self.host = "localhost"
         parts = hostport.split(":")
@@ -45,13 +100,23 @@ class HTTPTester():
         # Create reusable socket reference
         self.sock = None
 
-        # Create a dict of all test cases
-        self.testcases = {}
-        tfuncs = [f for f in inspect.getmembers(self, inspect.ismethod) if f[0].startswith("test_")]
-        for tf in tfuncs:
-            tf[1].__func__.__orig_lineno__ = tf[1].__wrapped__.__code__.co_firstlineno if hasattr(tf[1], "__wrapped__") else tf[1].__code__.co_firstlineno
-        for (fname, func) in sorted(tfuncs, key=lambda x: x[1].__orig_lineno__):
-            self.testcases[fname] = func
+        # Optional ConnectionPool shared by testers and whether the current test needs a fresh connection regardless
+        self.pool = None
+        self.needs_fresh_sock = False
+
+        # Optional CircuitBreaker shared by testers to stop connecting to an unreachable server
+        self.breaker = None
+
+        # Asyncio stream references and the event loop that owns them when running tests asynchronously
+        self.reader = None
+        self.writer = None
+        self.loop = None
+
+
+    @property
+    def testcases(self):
+        """Ordered dict of test case names to their bound methods"""
+        return {fname: getattr(self, fname) for fname in self.TESTCASES}
 
 
     def req_obj(self):
@@ -67,9 +132,126 @@ class HTTPTester():
             "status_code": 0,
             "status_text": "",
             "headers": {},
-            "payload": b"",
+            "payload": PayloadView(),
             "payload_size": 0,
-            "connection": "closed"
+            "connection": "closed",
+            "timing": self.timing_obj(),
+            "timeouts": self.timeouts_obj()
+        }
+
+
+    def timeouts_obj(self):
+        return {
+            "connection": self.CONNECTION_TIMEOUT,
+            "first_byte": self.RECV_FIRST_BYTE_TIMEOUT,
+            "end": self.RECV_END_TIMEOUT,
+            "linger": self.RECV_LINGER_TIMEOUT,
+            "calibrated": bool(self.calibration and self.calibration["timeouts"])
+        }
+
+
+    def timing_obj(self):
+        return {
+            "connect": None,
+            "send": None,
+            "first_byte": None,
+            "headers": None,
+            "total": None,
+            "bytes_sent": 0,
+            "bytes_received": 0
+        }
+
+
+    def probe_rtt(self):
+        """Return the connect and the first byte round trip times of a minimal request over a new connection, None for the failed ones"""
+        msg = f"HEAD / HTTP/1.1\r\nHost: {self.hostport}\r\nUser-Agent: {self.USERAGENT}\r\nConnection: close\r\n\r\n".encode()
+        connect_rtt = first_byte_rtt = None
+        with socket.socket() as sock:
+            try:
+                sock.settimeout(self.CALIBRATION_BOUNDS["CONNECTION_TIMEOUT"][1])
+                started = time.monotonic()
+                sock.connect((self.host, self.port))
+                connect_rtt = time.monotonic() - started
+                sock.settimeout(self.CALIBRATION_BOUNDS["RECV_FIRST_BYTE_TIMEOUT"][1])
+                sock.sendall(msg)
+                sent_at = time.monotonic()
+                if sock.recv(1):
+                    first_byte_rtt = time.monotonic() - sent_at
+            except Exception as e:
+                pass
+        return connect_rtt, first_byte_rtt
+
+
+    def calibrate_timeouts(self):
+        """Derive socket timeouts from the worst round trip times of a few probes, each within its configured floor and ceiling.
+        Timeouts are left as they are if the server can not be probed. Return the calibration, which is also kept for reports."""
+        samples = [self.probe_rtt() for _ in range(self.CALIBRATION_PROBES)]
+        connect_rtts = [c for c, f in samples if c is not None]
+        first_byte_rtts = [f for c, f in samples if f is not None]
+        rtts = {
+            "CONNECTION_TIMEOUT": connect_rtts,
+            "RECV_FIRST_BYTE_TIMEOUT": first_byte_rtts,
+            "RECV_END_TIMEOUT": first_byte_rtts,
+            "RECV_LINGER_TIMEOUT": first_byte_rtts
+        }
+        timeouts = {}
+        for name, (floor, ceiling) in self.CALIBRATION_BOUNDS.items():
+            if rtts[name]:
+                timeouts[name] = min(max(max(rtts[name]) * self.CALIBRATION_RTT_FACTOR, floor), ceiling)
+        self.apply_calibration({
+            "probes": len(samples),
+            "connect_rtts": connect_rtts,
+            "first_byte_rtts": first_byte_rtts,
+            "timeouts": timeouts
+        })
+        return self.calibration
+
+
+    def apply_calibration(self, calibration):
+        """Apply the timeouts of a calibration (e.g., done by another tester of the same server)"""
+        for name, value in calibration["timeouts"].items():
+            setattr(self, name, value)
+        self.calibration = calibration
+
+
+    def probe_ready(self, msg_file=None, **kwargs):
+        """Return None if the server accepts connections (and responds to the request of msg_file with a valid HTTP message, if given), otherwise why not"""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.CONNECTION_TIMEOUT):
+                pass
+        except Exception as e:
+            return f"Connection to the server `{self.hostport}` failed: {e}"
+        if msg_file:
+            t = self.clone()
+            t.pool = None
+            report = t.netcat(msg_file, **kwargs)
+            t.reset_sock()
+            if report["errors"]:
+                return report["errors"][0]
+        return None
+
+
+    def wait_ready(self, timeout=None, msg_file=None, **kwargs):
+        """Probe the server with exponential backoff until it is ready or the timeout (in seconds) expires.
+        Return the readiness with the time it took the server to get ready, the number of probes, and the last reason it was not ready."""
+        timeout = self.READINESS_TIMEOUT if timeout is None else timeout
+        msg_file = msg_file or self.READINESS_MSG_FILE
+        delay, max_delay = self.READINESS_BACKOFF
+        started = time.monotonic()
+        probes = 0
+        while True:
+            probes += 1
+            error = self.probe_ready(msg_file, **kwargs)
+            elapsed = time.monotonic() - started
+            if error is None or elapsed >= timeout:
+                break
+            time.sleep(min(delay, timeout - elapsed))
+            delay = min(delay * 2, max_delay)
+        return {
+            "ready": error is None,
+            "time_to_ready": elapsed if error is None else None,
+            "probes": probes,
+            "error": error
         }
 
 
@@ -79,78 +261,314 @@ class HTTPTester():
         self.sock.connect((self.host, self.port))
 
 
+    def allow_connect(self):
+        """Return whether a new connection may be attempted, i.e., the circuit of the server is not open (if there is a breaker)"""
+        return not self.breaker or self.breaker.allow(self.host, self.port)
+
+
+    def record_connect(self, connected):
+        if self.breaker:
+            self.breaker.record(self.host, self.port, connected)
+
+
+    def short_circuit(self, report, timing, started):
+        report["errors"].append(f"Server `{self.host}:{self.port}` unreachable, not connecting again after {self.breaker.threshold} consecutive connection failures")
+        self.record_timing(report, timing, started)
+        return report
+
+
+    def checkout_sock(self):
+        """Take a live idle connection from the pool, if any and if the current test allows, and return whether it did"""
+        if not self.sock and self.pool and not self.needs_fresh_sock:
+            self.sock = self.pool.acquire(self.host, self.port)
+            return self.sock is not None
+        return False
+
+
+    def checkin_sock(self, reusable):
+        """Return the connection to the pool if it is reusable and pooling applies to the current test, close it otherwise"""
+        if self.sock and reusable and self.pool and not self.needs_fresh_sock:
+            self.pool.release(self.host, self.port, self.sock)
+            self.sock = None
+        self.reset_sock()
+
+
     def reset_sock(self):
         if self.sock:
             self.sock.close()
             self.sock = None
+        if self.writer:
+            self.writer.close()
+            self.reader = self.writer = None
 
 
-    def netcat(self, msg_file, keep_alive=False, skip_parsing=False, **kwargs):
-        report = {
+    def clone(self):
+        """Return a copy of this tester with its own connection state to run a test in isolation"""
+        t = copy.copy(self)
+        t.sock = t.reader = t.writer = t.loop = None
+        return t
+
+
+    def report_obj(self):
+        return {
             "req": self.req_obj(),
             "res": self.res_obj(),
             "errors": [],
             "notes": [],
         }
-        with open(os.path.join(self.MSGDIR, msg_file), "rb") as f:
-            msg = self.replace_placeholders(f.read(), **kwargs)
-            hdrs, sep, pld = self.split_http_message(msg)
-            msg = hdrs.replace(b"<PIPELINE>", b"").replace(b"\r", b"").replace(b"\n", b"\r\n") + b"\r\n\r\n" + pld
-            report["req"]["raw"] = msg.decode()
-            if self.sock:
-                report["notes"].append(f"Reusing existing connection")
+
+
+    def render_message(self, msg_file, **kwargs):
+        return load_template(os.path.join(self.MSGDIR, msg_file)).render(self.placeholder_values(**kwargs))
+
+
+    def process_response_data(self, rbuf, report, skip_parsing=False, framer=None, sent_at=None):
+        if not report["errors"]:
+            report["notes"].append("Response data read")
+            if skip_parsing:
+                report["res"]["raw_headers"] = str(rbuf.view(), "utf-8")
             else:
-                report["notes"].append(f"Connecting to the `{self.host}:{self.port}` server")
-                try:
-                    self.connect_sock()
-                except Exception as e:
-                    report["errors"].append(f"Connection to the server `{self.host}:{self.port}` failed: {e}")
-                    self.reset_sock()
-                    return report
+                self.parse_response(rbuf.view(), report)
+                self.attach_spooled_payload(rbuf, report)
+                if framer and len(framer.methods) > 1:
+                    report["responses"] = self.split_responses(rbuf, framer, sent_at)
+
+
+    def attach_spooled_payload(self, rbuf, report):
+        if rbuf.spool and isinstance(report["res"]["payload"], PayloadView):
+            report["res"]["payload"] = rbuf.spooled_payload(report["res"]["payload"])
+            report["res"]["payload_size"] = len(report["res"]["payload"])
+
+
+    def split_responses(self, rbuf, framer, sent_at):
+        """Return an ordered list of reports of pipelined responses as they were framed while arriving.
+        Anything after the last framed response (e.g., a response delimited by the connection close) is reported as the last one.
+        Arrival times of the first byte and the completion of each response are relative to when the request was sent."""
+        responses = []
+        view = rbuf.view()
+        spans = list(framer.spans)
+        if framer.start <= len(view) and (re.search(rb"\S", view[framer.start:]) or rbuf.spool):
+            spans.append((framer.start, len(view), framer.first_byte_at, None))
+        for start, end, first_byte_at, complete_at in spans:
+            report = self.report_obj()
+            self.parse_response(view[start:end], report)
+            if end >= len(view):
+                self.attach_spooled_payload(rbuf, report)
+            report["res"]["arrival"] = {
+                "first_byte": first_byte_at - sent_at if first_byte_at else None,
+                "complete": complete_at - sent_at if complete_at else None
+            }
+            responses.append(report)
+        return responses
+
+
+    def next_response(self, report, position="Next"):
+        """Make the next pipelined response available for assertions in the report, asserting that it is a valid HTTP message"""
+        idx = report.get("response_index", 0) + 1
+        report["response_index"] = idx
+        report["notes"].append(f"Parsing {position.lower()} response")
+        responses = report.get("responses", [])
+        if idx < len(responses):
+            # The connection state and timing are only known for the exchange as a whole
+            responses[idx]["res"]["connection"] = report["res"]["connection"]
+            responses[idx]["res"]["timing"] = report["res"]["timing"]
+            report["res"] = responses[idx]["res"]
+            report["errors"] += responses[idx]["errors"]
+            report["notes"] += responses[idx]["notes"]
+        else:
+            report["res"] = self.res_obj()
+            report["errors"].append("Empty response")
+        assert not report["errors"], f"{position} response should be a valid HTTP Message"
+
+
+    def record_timing(self, report, timing, started, sent_at=None, first_at=None, last_at=None, framer=None, rbuf=None):
+        """Attach the timing of all the phases of an exchange that started at the started time to the report.
+        Connect and send times are durations, first byte and headers complete times are relative to when the request was sent,
+        and the total time spans from the start to the last byte received (or to now, if none was received)."""
+        if first_at:
+            timing["first_byte"] = first_at - sent_at
+        if framer and framer.headers_at:
+            timing["headers"] = framer.headers_at - sent_at
+        if rbuf:
+            timing["bytes_received"] = rbuf.length
+        timing["total"] = (last_at or time.monotonic()) - started
+        report["res"]["timing"] = timing
+
+
+    def netcat(self, msg_file, keep_alive=False, skip_parsing=False, **kwargs):
+        if self.loop:
+            # Running a test body off the event loop thread, hand the request over to the async transport
+            return asyncio.run_coroutine_threadsafe(self.anetcat(msg_file, keep_alive=keep_alive, skip_parsing=skip_parsing, **kwargs), self.loop).result()
+        report = self.report_obj()
+        msg = self.render_message(msg_file, **kwargs)
+        report["req"]["raw"] = msg.decode()
+        timing = self.timing_obj()
+        timing["bytes_sent"] = len(msg)
+        started = time.monotonic()
+        pooled = self.checkout_sock()
+        if self.sock:
+            report["notes"].append(f"Reusing existing connection")
+        elif not self.allow_connect():
+            return self.short_circuit(report, timing, started)
+        else:
+            report["notes"].append(f"Connecting to the `{self.host}:{self.port}` server")
             try:
-                self.sock.settimeout(self.SEND_DATA_TIMEOUT)
-                self.sock.sendall(msg)
-                report["notes"].append("Request data sent")
+                self.connect_sock()
+                timing["connect"] = time.monotonic() - started
+                self.record_connect(True)
             except Exception as e:
-                report["errors"].append(f"Sending data failed: {e}")
-                keep_alive or self.reset_sock()
+                report["errors"].append(f"Connection to the server `{self.host}:{self.port}` failed: {e}")
+                self.record_connect(False)
+                self.reset_sock()
+                self.record_timing(report, timing, started)
                 return report
+        try:
+            self.sock.settimeout(self.SEND_DATA_TIMEOUT)
+            send_at = time.monotonic()
+            self.sock.sendall(msg)
+            sent_at = time.monotonic()
+            timing["send"] = sent_at - send_at
+            report["notes"].append("Request data sent")
+        except Exception as e:
+            if pooled and isinstance(e, ConnectionError):
+                # The server closed the idle connection meanwhile, fall back to a new connection
+                self.reset_sock()
+                return self.netcat(msg_file, keep_alive=keep_alive, skip_parsing=skip_parsing, **kwargs)
+            report["errors"].append(f"Sending data failed: {e}")
+            keep_alive or self.reset_sock()
+            self.record_timing(report, timing, started)
+            return report
+        rbuf = ReceiveBuffer(spool_size=self.RECV_SPOOL_SIZE)
+        framer = None if skip_parsing else ResponseFramer(msg, rbuf)
+        first_at = last_at = None
+        reset = False
+        try:
+            self.sock.settimeout(self.RECV_FIRST_BYTE_TIMEOUT)
+            received = rbuf.recv_into(self.sock)
+            self.sock.settimeout(self.RECV_END_TIMEOUT)
+            while received:
+                last_at = time.monotonic()
+                first_at = first_at or last_at
+                if framer and framer.feed():
+                    if not framer.close_expected and not self.RECV_LINGER_TIMEOUT:
+                        # Not lingering for any extra data, leave the connection open
+                        report["res"]["connection"] = "alive"
+                        break
+                    # All responses are framed, only wait long for the connection to close if it is expected to
+                    self.sock.settimeout(self.RECV_END_TIMEOUT if framer.close_expected else self.RECV_LINGER_TIMEOUT)
+                if rbuf.length >= self.RECV_MAX_SIZE:
+                    report["errors"].append(f"Response exceeded the limit of `{self.RECV_MAX_SIZE}` bytes")
+                    break
+                received = rbuf.recv_into(self.sock)
+        except socket.timeout as e:
+            report["res"]["connection"] = "alive"
+        except Exception as e:
+            reset = isinstance(e, ConnectionError)
+            report["errors"].append(f"Reading data failed: {e}")
+        if pooled and not rbuf.length and (reset or (report["res"]["connection"] == "closed" and not report["errors"])):
+            # The server closed (or reset) the idle connection without responding, fall back to a new connection
+            # A server that is merely slow to respond is not retried, the timeout is reported as is
+            self.reset_sock()
+            return self.netcat(msg_file, keep_alive=keep_alive, skip_parsing=skip_parsing, **kwargs)
+        if not keep_alive:
+            # Only an exchange that is completely framed without any stray data leaves the connection reusable
+            self.checkin_sock(framer and framer.complete and not framer.close_expected and framer.pos == rbuf.length and report["res"]["connection"] == "alive" and not report["errors"])
+        self.process_response_data(rbuf, report, skip_parsing, framer, sent_at)
+        self.record_timing(report, timing, started, sent_at, first_at, last_at, framer, rbuf)
+        return report
+
+
+    async def aconnect_sock(self):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.CONNECTION_TIMEOUT)
+
+
+    async def anetcat(self, msg_file, keep_alive=False, skip_parsing=False, **kwargs):
+        """Asynchronous counterpart of netcat that talks to the server over asyncio streams"""
+        report = self.report_obj()
+        msg = self.render_message(msg_file, **kwargs)
+        report["req"]["raw"] = msg.decode()
+        timing = self.timing_obj()
+        timing["bytes_sent"] = len(msg)
+        started = time.monotonic()
+        if self.writer:
+            report["notes"].append(f"Reusing existing connection")
+        elif not self.allow_connect():
+            return self.short_circuit(report, timing, started)
+        else:
+            report["notes"].append(f"Connecting to the `{self.host}:{self.port}` server")
             try:
-                data = []
-                self.sock.settimeout(self.RECV_FIRST_BYTE_TIMEOUT)
-                buf = self.sock.recv(4096)
-                self.sock.settimeout(self.RECV_END_TIMEOUT)
-                while buf:
-                    data.append(buf)
-                    buf = self.sock.recv(4096)
-            except socket.timeout as e:
-                report["res"]["connection"] = "alive"
+                await self.aconnect_sock()
+                timing["connect"] = time.monotonic() - started
+                self.record_connect(True)
+            except asyncio.TimeoutError as e:
+                report["errors"].append(f"Connection to the server `{self.host}:{self.port}` failed: timed out")
+                self.record_connect(False)
+                self.reset_sock()
+                self.record_timing(report, timing, started)
+                return report
             except Exception as e:
-                report["errors"].append(f"Reading data failed: {e}")
+                report["errors"].append(f"Connection to the server `{self.host}:{self.port}` failed: {e}")
+                self.record_connect(False)
+                self.reset_sock()
+                self.record_timing(report, timing, started)
+                return report
+        try:
+            send_at = time.monotonic()
+            self.writer.write(msg)
+            await asyncio.wait_for(self.writer.drain(), self.SEND_DATA_TIMEOUT)
+            sent_at = time.monotonic()
+            timing["send"] = sent_at - send_at
+            report["notes"].append("Request data sent")
+        except Exception as e:
+            report["errors"].append(f"Sending data failed: {e}")
             keep_alive or self.reset_sock()
-            if not report["errors"]:
-                report["notes"].append("Response data read")
-                if skip_parsing:
-                    report["res"]["raw_headers"] = b"".join(data).decode()
-                else:
-                    self.parse_response(b"".join(data), report)
+            self.record_timing(report, timing, started)
+            return report
+        rbuf = ReceiveBuffer(spool_size=self.RECV_SPOOL_SIZE)
+        framer = None if skip_parsing else ResponseFramer(msg, rbuf)
+        first_at = last_at = None
+        try:
+            buf = await asyncio.wait_for(self.reader.read(65536), self.RECV_FIRST_BYTE_TIMEOUT)
+            timeout = self.RECV_END_TIMEOUT
+            while buf:
+                last_at = time.monotonic()
+                first_at = first_at or last_at
+                rbuf.write(buf)
+                if framer and framer.feed():
+                    if not framer.close_expected and not self.RECV_LINGER_TIMEOUT:
+                        report["res"]["connection"] = "alive"
+                        break
+                    timeout = self.RECV_END_TIMEOUT if framer.close_expected else self.RECV_LINGER_TIMEOUT
+                if rbuf.length >= self.RECV_MAX_SIZE:
+                    report["errors"].append(f"Response exceeded the limit of `{self.RECV_MAX_SIZE}` bytes")
+                    break
+                buf = await asyncio.wait_for(self.reader.read(65536), timeout)
+        except asyncio.TimeoutError as e:
+            report["res"]["connection"] = "alive"
+        except Exception as e:
+            report["errors"].append(f"Reading data failed: {e}")
+        keep_alive or self.reset_sock()
+        self.process_response_data(rbuf, report, skip_parsing, framer, sent_at)
+        self.record_timing(report, timing, started, sent_at, first_at, last_at, framer, rbuf)
         return report
 
 
-    def replace_placeholders(self, msg, **kwargs):
+    def placeholder_values(self, **kwargs):
         replacements = {
-            "<HOST>": self.host,
-            "<PORT>": str(self.port),
-            "<HOSTPORT>": self.hostport,
-            "<EPOCH>": self.EPOCH,
-            "<RANDOMINT>": self.RANDOMINT,
-            "<USERAGENT>": self.USERAGENT
+            "HOST": self.host,
+            "PORT": str(self.port),
+            "HOSTPORT": self.hostport,
+            "EPOCH": self.EPOCH,
+            "RANDOMINT": self.RANDOMINT,
+            "USERAGENT": self.USERAGENT
         }
-        for k, v in kwargs.items():
-            replacements[f"<{k}>"] = v
+        replacements.update(kwargs)
+        return {k: v.encode() for k, v in replacements.items()}
+
 
-        for placeholder, replacement in replacements.items():
-            msg = msg.replace(placeholder.encode(), replacement.encode())
+    def replace_placeholders(self, msg, **kwargs):
+        for placeholder, replacement in self.placeholder_values(**kwargs).items():
+            msg = msg.replace(f"<{placeholder}>".encode(), replacement)
         return msg
 
 
@@ -163,8 +581,10 @@ class HTTPTester():
 
 
     def slice_payload(self, msg, report):
+        """Split the payload into the part framed by the headers and the rest, spooled payloads are sliced without loading them"""
+        if not isinstance(msg, SpooledPayload):
+            msg = PayloadView(msg)
         marker = 0
-        dechunked = b""
         cl = report["res"]["headers"].get("content-length")
         if cl:
             try:
@@ -173,8 +593,17 @@ class HTTPTester():
                 report["errors"].append(f"`Content-Length: {cl}` is not a valid number")
         elif report["res"]["headers"].get("transfer-encoding", "").endswith("chunked"):
             try:
-                for chunk, marker in self.read_chunk(msg):
-                    dechunked += chunk
+                decoder = ChunkedDecoder(keep_body=False)
+                # Partial lines left unconsumed at the end of a block are carried over to the next one
+                carry = b""
+                for block in msg.blocks():
+                    data = carry + bytes(block) if carry else block
+                    pos = decoder.feed(data)
+                    marker += pos
+                    carry = data[pos:]
+                    if decoder.done:
+                        break
+                decoder.finish()
             except Exception as e:
                 report["errors"].append(str(e))
                 marker = 0
@@ -183,40 +612,25 @@ class HTTPTester():
         return msg[:marker], msg[marker:]
 
 
-    def read_chunk(self, msg):
-        s = io.BytesIO(msg)
-        for chdesc in s:
-            try:
-                chsize = int(chdesc.split(b";")[0].strip(), 16)
-            except Exception as e:
-                cd = chdesc.decode().strip("\r\n")
-                raise ValueError(f'Chunk descriptor `{cd}` must begin with a Hexadecimal number')
-            ch = s.read(chsize)
-            if s.readline() != b"\r\n":
-                raise ValueError("Chunk is not terminated with a `CRLF`")
-            yield ch, s.tell()
-            if chsize == 0:
-                return
-
-
     def parse_response(self, msg, report):
-        if not msg.strip():
+        msg = PayloadView(msg)
+        if not re.search(rb"\S", msg.view):
             report["res"] = self.res_obj()
             report["errors"].append("Empty response")
             return
-        hdrs, sep, pld = self.split_http_message(msg)
+        hdrs, sep, pld = self.split_http_message(msg.view)
         try:
-            hdrs = hdrs.decode()
+            hdrs = str(hdrs, "utf-8")
         except UnicodeDecodeError as e:
-            pld = hdrs[e.start:] + sep + pld
-            hdrs = hdrs[:e.start].decode().rstrip("\n")
+            pld = bytes(hdrs[e.start:]) + bytes(sep) + bytes(pld)
+            hdrs = str(hdrs[:e.start], "utf-8").rstrip("\n")
             sep = b""
             report["errors"].append("Non-UTF-8 data in headers")
         if not sep:
             report["errors"].append("Missing empty line after headers")
         if sep == b"\n\n":
             report["errors"].append("Using `LF` as header separator instead of `CRLF`")
-        report["res"]["payload"] = pld
+        report["res"]["payload"] = PayloadView(pld)
         report["res"]["payload_size"] = len(pld)
         report["res"]["raw_headers"] = hdrs
         hdrs = hdrs.replace("\r", "").replace("\n\t", "\t").replace("\n ", " ")
@@ -250,16 +664,146 @@ class HTTPTester():
     def run_single_test(self, test_id):
         err = f"Test {test_id} not valid"
         if test_id.startswith("test_"):
-            try:
-                return self.testcases[test_id]()
-            except KeyError as e:
-                err = f"Test {test_id} not implemented"
+            if test_id in self.TESTCASES:
+                return getattr(self, test_id)()
+            err = f"Test {test_id} not implemented"
         raise Exception(err)
 
 
-    def run_all_tests(self):
-        for fname, func in self.testcases.items():
-            yield func()
+    def run_all_tests(self, pending=None):
+        """Run test cases in order, long waiting ones run in the background (unless already started) to overlap their waits"""
+        with contextlib.ExitStack() as stack:
+            if pending is None:
+                executor = stack.enter_context(concurrent.futures.ThreadPoolExecutor())
+                pending = self.start_long_wait_tests(executor)
+            for fname in self.TESTCASES:
+                yield pending[fname].result() if fname in pending else getattr(self, fname)()
+
+
+    def long_wait_tests(self):
+        return [fname for fname, meta in self.TESTCASES.items() if meta["long_wait"]]
+
+
+    def start_long_wait_tests(self, executor):
+        """Submit long waiting test cases to the executor on isolated clones and return their futures"""
+        return {fname: executor.submit(self.run_isolated_test, fname) for fname in self.long_wait_tests()}
+
+
+    def run_isolated_test(self, test_id):
+        """Run a test case on a clone with its own connection state, safe to call from concurrent threads"""
+        return getattr(self.clone(), test_id)()
+
+
+    def serial_tests(self):
+        return [fname for fname, meta in self.TESTCASES.items() if meta["serial"]]
+
+
+    async def arun_test(self, test_id, executor=None):
+        """Run a test case on an isolated clone using the async transport, test body phases run in a worker thread of the executor.
+        Idle waits between the phases are awaited on the loop, so they do not hold a worker thread.
+        Test bodies block on their nested requests, so the executor should not be the loop's default one that resolves host names."""
+        t = self.clone()
+        t.loop = asyncio.get_running_loop()
+        meta = self.TESTCASES[test_id]
+        func = getattr(type(self), test_id).__wrapped__
+        try:
+            report = await t.anetcat(meta["msg_file"], **meta["params"])
+            with contextlib.ExitStack() as stack:
+                if executor is None:
+                    executor = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=1))
+                phases = t.assertion_phases(func, report)
+                delay = await t.loop.run_in_executor(executor, next, phases, None)
+                while delay is not None:
+                    await asyncio.sleep(delay)
+                    delay = await t.loop.run_in_executor(executor, next, phases, None)
+        finally:
+            # A cancelled test does not leave its connection open
+            t.reset_sock()
+        return t.result_obj(func, report)
+
+
+    async def arun_all_tests(self, concurrency=8, executor=None):
+        """Run test cases concurrently (at most concurrency at a time) and yield results as they finish.
+        Serial test cases run one at a time in their original order.
+        Test bodies run in the executor if one is given (e.g., shared by many runs), otherwise in a pool of this run.
+        Closing the generator early (e.g., with contextlib.aclosing) cancels the tests that have not finished yet."""
+        sem = asyncio.Semaphore(concurrency)
+        lock = asyncio.Lock()
+        serial = self.serial_tests()
+
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+
+        async def bounded(test_id):
+            async with lock if test_id in serial else contextlib.nullcontext():
+                async with sem:
+                    return await self.arun_test(test_id, executor)
+
+        # Tasks start in creation order, so serial ones queue up on the (FIFO) lock in their original order
+        # Long waiting ones are started first to overlap their waits with the rest
+        long_wait = self.long_wait_tests()
+        ordered = long_wait + [fname for fname in self.TESTCASES if fname not in long_wait]
+        tasks = [asyncio.create_task(bounded(fname)) for fname in ordered]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # Nobody reads the results of the pending tests anymore (e.g., the client went away), stop testing the server
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_executor:
+                executor.shutdown(wait=False)
+
+
+    def run_assertions(self, func, report):
+        for delay in self.assertion_phases(func, report):
+            time.sleep(delay)
+
+
+    def assertion_phases(self, func, report):
+        """Run a test body on the report one phase at a time, yielding the seconds to idly wait between its phases.
+        A test body that idly waits (e.g., for a connection timeout) is a generator that yields the seconds to wait."""
+        try:
+            if not report["errors"]:
+                phases = func(self, report)
+                if inspect.isgenerator(phases):
+                    yield from phases
+        except AssertionError as e:
+            report["errors"].append(f"ASSERTION: {e}")
+
+
+    def result_obj(self, func, report):
+        return {"id": func.__name__, "suite": self.__class__.__name__.lower(), "description": func.__doc__, "errors": report["errors"], "notes": report["notes"], "req": report["req"], "res": report["res"]}
+
+
+    @classmethod
+    def serial(cls, func):
+        """Test decorator that marks a test case as mutating the server state.
+        Serial test cases never overlap with each other when tests run concurrently.
+        Intended to be used on top of the request decorator."""
+        func.__serial__ = True
+        return func
+
+
+    @classmethod
+    def long_wait(cls, func):
+        """Test decorator that marks a test case as idly waiting for a long time (e.g., for a connection timeout).
+        Long waiting test cases are started first and run in the background to overlap their waits with other tests.
+        Their bodies should yield the seconds to wait instead of sleeping, so asynchronous runs do not hold a thread meanwhile.
+        Intended to be used on top of the request decorator."""
+        func.__long_wait__ = True
+        return func
+
+
+    @classmethod
+    def fresh_connection(cls, func):
+        """Test decorator that marks a test case as depending on connection lifecycle, so it never reuses a pooled connection.
+        Test cases that check the connection state, wait long, or keep the connection alive are marked implicitly.
+        Intended to be used on top of the request decorator."""
+        func.__fresh_connection__ = True
+        return func
 
 
     @classmethod
@@ -270,14 +814,12 @@ class HTTPTester():
         def test_decorator(func):
             @functools.wraps(func)
             def wrapper(self):
+                self.needs_fresh_sock = self.TESTCASES.get(func.__name__, {}).get("fresh_connection", False)
                 report = self.netcat(msg_file, **kwargs)
-                try:
-                    if not report["errors"]:
-                        func(self, report)
-                except AssertionError as e:
-                    report["errors"].append(f"ASSERTION: {e}")
+                self.run_assertions(func, report)
                 self.reset_sock()
-                return {"id": func.__name__, "suite": self.__class__.__name__.lower(), "description": func.__doc__, "errors": report["errors"], "notes": report["notes"], "req": report["req"], "res": report["res"]}
+                return self.result_obj(func, report)
+            wrapper.__request__ = (msg_file, kwargs)
             return wrapper
         return test_decorator
 
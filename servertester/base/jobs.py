@@ -0,0 +1,156 @@
+import time
+import uuid
+import threading
+import collections
+
+
+class Job():
+    """Job is a unit of background work with a state and a log that can be followed while the job runs"""
+
+    def __init__(self, key, owner, func, args):
+        """Initialize a Job that calls func(job, *args) on behalf of the owner, jobs with the same key are duplicates"""
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.owner = owner
+        self.func = func
+        self.args = args
+        self.state = "queued"
+        self.logs = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cond = threading.Condition()
+
+
+    @property
+    def done(self):
+        return self.state in ("succeeded", "failed")
+
+
+    def log(self, line):
+        with self.cond:
+            self.logs.append(line)
+            self.cond.notify_all()
+
+
+    def finish(self, state):
+        with self.cond:
+            self.state = state
+            self.finished = time.time()
+            self.cond.notify_all()
+
+
+    def follow(self, timeout=None):
+        """Yield log lines from the beginning, waiting for new ones until the job is done.
+        With a timeout, None is yielded whenever nothing is logged for that many seconds (e.g., for followers to check whether they are still needed)."""
+        pos = 0
+        while True:
+            with self.cond:
+                if pos >= len(self.logs) and not self.done:
+                    self.cond.wait(timeout)
+                lines = self.logs[pos:]
+                done = self.done
+            pos += len(lines)
+            yield from lines
+            if done and not lines:
+                return
+            if not lines:
+                yield None
+
+
+    def wait(self, timeout=None):
+        """Block until the job is done and return whether it is"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.done, timeout)
+
+
+    def status(self):
+        return {
+            "id": self.id,
+            "owner": self.owner,
+            "key": list(self.key),
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "log_lines": len(self.logs)
+        }
+
+
+class JobQueue():
+    """JobQueue runs jobs on a bounded pool of worker threads in the order they are submitted.
+    An unfinished job is reused for duplicate submissions, and an owner only has a limited number of jobs running at a time."""
+
+    def __init__(self, workers=4, per_owner=1, max_pending=100, retention=1000):
+        """Initialize a JobQueue of workers threads that keeps at most max_pending jobs waiting and the retention latest jobs known"""
+        self.per_owner = per_owner
+        self.max_pending = max_pending
+        self.retention = retention
+        self.jobs = collections.OrderedDict()
+        self.pending = collections.deque()
+        self.active = {}
+        self.running = collections.Counter()
+        self.cond = threading.Condition()
+        for _ in range(workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+
+    def submit(self, key, owner, func, *args):
+        """Queue a job and return it along with whether it is a duplicate of an unfinished one.
+        Raise OverflowError if too many jobs are waiting."""
+        with self.cond:
+            job = self.active.get(key)
+            if job:
+                return job, True
+            if len(self.pending) >= self.max_pending:
+                raise OverflowError("Too many jobs are waiting, try again later")
+            job = Job(key, owner, func, args)
+            self.jobs[job.id] = job
+            self.active[key] = job
+            self.pending.append(job)
+            # Forget the oldest finished jobs beyond the retention, even if unfinished ones (e.g., stuck) are older
+            excess = len(self.jobs) - self.retention
+            if excess > 0:
+                for job_id in [j.id for j in self.jobs.values() if j.done][:excess]:
+                    del self.jobs[job_id]
+            self.cond.notify_all()
+            return job, False
+
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+
+    def position(self, job):
+        """Return the number of jobs waiting ahead of the job"""
+        with self.cond:
+            return self.pending.index(job) if job in self.pending else 0
+
+
+    def next_job(self):
+        """Take the first waiting job whose owner is below the limit of running jobs, blocking until there is one"""
+        with self.cond:
+            while True:
+                for job in self.pending:
+                    if self.running[job.owner] < self.per_owner:
+                        self.pending.remove(job)
+                        self.running[job.owner] += 1
+                        return job
+                self.cond.wait()
+
+
+    def work(self):
+        while True:
+            job = self.next_job()
+            job.state = "running"
+            job.started = time.time()
+            try:
+                state = "succeeded" if job.func(job, *job.args) else "failed"
+            except Exception as e:
+                job.log(f"{e}")
+                state = "failed"
+            with self.cond:
+                self.running[job.owner] -= 1
+                del self.active[job.key]
+                self.cond.notify_all()
+            job.finish(state)
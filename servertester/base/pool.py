@@ -0,0 +1,64 @@
+import time
+import socket
+import threading
+import collections
+
+
+class ConnectionPool():
+    """ConnectionPool keeps idle keep-alive connections per server to be reused by tests that do not assert on connection lifecycle"""
+
+    def __init__(self, max_idle=8, idle_timeout=1.0):
+        """Initialize a ConnectionPool that keeps at most max_idle connections per server, each for up to idle_timeout seconds"""
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.idle = collections.defaultdict(collections.deque)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def acquire(self, host, port):
+        """Return a live idle connection to the server, or None if there is none"""
+        while True:
+            with self.lock:
+                conns = self.idle.get((host, port))
+                if not conns:
+                    self.misses += 1
+                    return None
+                # The most recently released connection is the most likely to be still alive
+                sock, since = conns.pop()
+            if time.monotonic() - since < self.idle_timeout and self.is_alive(sock):
+                with self.lock:
+                    self.hits += 1
+                return sock
+            sock.close()
+
+
+    def release(self, host, port, sock):
+        """Return an idle connection to the pool, evicting the oldest ones beyond the limit"""
+        with self.lock:
+            conns = self.idle[(host, port)]
+            conns.append((sock, time.monotonic()))
+            while len(conns) > self.max_idle:
+                conns.popleft()[0].close()
+
+
+    def is_alive(self, sock):
+        """A connection is live if it is neither closed by the server nor has any unsolicited data pending"""
+        try:
+            sock.setblocking(False)
+            sock.recv(1, socket.MSG_PEEK)
+            return False
+        except BlockingIOError as e:
+            return True
+        except OSError as e:
+            return False
+
+
+    def close(self):
+        """Close all the idle connections"""
+        with self.lock:
+            for conns in self.idle.values():
+                for sock, since in conns:
+                    sock.close()
+            self.idle.clear()
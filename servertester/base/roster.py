@@ -0,0 +1,112 @@
+import os
+import csv
+import json
+import time
+import threading
+import urllib.parse
+
+import requests
+
+
+class Roster():
+    """Roster keeps the members of a course from a CSV file (at a URL or a local path) in memory and in a cache file.
+    It is loaded lazily from the cache file and refreshed in the background, revalidating with ETag/Last-Modified (or the modification time of a local file)."""
+
+    def __init__(self, source, cache_path, refresh_interval=600, timeout=10):
+        """Initialize a Roster of the source CSV that is refreshed every refresh_interval seconds, fetching it within timeout seconds"""
+        self.source = source
+        self.cache_path = cache_path
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.validators = {}
+        self.fetched = None
+        self._members = None
+        self.refresher = None
+        self.lock = threading.Lock()
+
+
+    @property
+    def members(self):
+        """Dict of member ids to their details, empty until loaded from the cache file or the source"""
+        if self.refresher is None:
+            with self.lock:
+                if self.refresher is None:
+                    self.load_cache()
+                    self.refresher = threading.Thread(target=self.refresh_forever, daemon=True)
+                    self.refresher.start()
+        return self._members or {}
+
+
+    def parse(self, content):
+        return {m["csid"]: {"name": m["name"], "ghid": m["ghid"], "repo": m["repo"]} for m in csv.DictReader(content.splitlines())}
+
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+            if cache["source"] == self.source:
+                self._members = self.parse(cache["content"])
+                self.validators = cache["validators"]
+                self.fetched = cache["fetched"]
+        except Exception as e:
+            pass
+
+
+    def save_cache(self, content):
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "validators": self.validators, "fetched": self.fetched, "content": content}, f)
+        os.replace(tmp, self.cache_path)
+
+
+    def local_path(self):
+        """Return the path of the source if it is a local file, otherwise None"""
+        url = urllib.parse.urlparse(self.source)
+        if url.scheme == "file":
+            return urllib.parse.unquote(url.path)
+        return None if url.scheme in ("http", "https") else self.source
+
+
+    def fetch(self):
+        """Return the content of the source if it changed since the last fetch, otherwise None"""
+        path = self.local_path()
+        if path:
+            mtime = os.stat(path).st_mtime
+            if mtime == self.validators.get("mtime"):
+                return None
+            with open(path) as f:
+                content = f.read()
+            self.validators = {"mtime": mtime}
+            return content
+        headers = {}
+        if self.validators.get("etag"):
+            headers["If-None-Match"] = self.validators["etag"]
+        if self.validators.get("last_modified"):
+            headers["If-Modified-Since"] = self.validators["last_modified"]
+        res = requests.get(self.source, headers=headers, timeout=self.timeout)
+        if res.status_code == 304:
+            return None
+        res.raise_for_status()
+        self.validators = {"etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified")}
+        return res.content.decode()
+
+
+    def refresh(self):
+        """Revalidate the roster against its source, return whether it changed"""
+        content = self.fetch()
+        self.fetched = time.time()
+        if content is None:
+            return False
+        self._members = self.parse(content)
+        self.save_cache(content)
+        return True
+
+
+    def refresh_forever(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Refreshing members from `{self.source}` failed: {e}")
+            time.sleep(self.refresh_interval)
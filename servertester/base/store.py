@@ -0,0 +1,210 @@
+import json
+import time
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS targets (
+    id INTEGER PRIMARY KEY,
+    hostport TEXT NOT NULL UNIQUE,
+    student TEXT
+);
+CREATE TABLE IF NOT EXISTS suites (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    target_id INTEGER NOT NULL REFERENCES targets(id),
+    suite_id INTEGER NOT NULL REFERENCES suites(id),
+    test_id TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    errors TEXT NOT NULL,
+    status_code INTEGER,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    test_row_id INTEGER PRIMARY KEY REFERENCES tests(id),
+    connect REAL,
+    send REAL,
+    first_byte REAL,
+    headers REAL,
+    total REAL,
+    bytes_sent INTEGER,
+    bytes_received INTEGER
+);
+CREATE INDEX IF NOT EXISTS targets_student ON targets(student);
+CREATE INDEX IF NOT EXISTS tests_target_suite_test ON tests(target_id, suite_id, test_id, id);
+CREATE INDEX IF NOT EXISTS tests_suite_test ON tests(suite_id, test_id);
+CREATE INDEX IF NOT EXISTS tests_run ON tests(run_id);
+CREATE INDEX IF NOT EXISTS tests_created ON tests(created);
+"""
+
+TIMING_PHASES = ["connect", "send", "first_byte", "headers", "total", "bytes_sent", "bytes_received"]
+
+
+class ResultStore():
+    """ResultStore keeps the history of test results of all the runs against all the targets in a SQLite database.
+    Each recorder and query uses its own connection, so a store can be shared by threads."""
+
+    def __init__(self, path):
+        """Initialize a ResultStore in the SQLite database file at the path, creating the schema if needed"""
+        self.path = path
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+
+    def connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=check_same_thread)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+    def recorder(self, source, batch_size=50, check_same_thread=True):
+        """Return a RunRecorder of a new run from the source (e.g., `main` or `server`)"""
+        return RunRecorder(self, source, batch_size, check_same_thread)
+
+
+    def query(self, sql, params=()):
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+
+    def target_filter(self, target):
+        """SQL condition and params to match a target by its student id or its host:port"""
+        return "(targets.student = ? OR targets.hostport = ?)", [target, target]
+
+
+    def latest_results(self, target, suite=None):
+        """Return the latest result of each test of the target (a student id or a host:port), optionally of a suite"""
+        cond, params = self.target_filter(target)
+        if suite:
+            cond += " AND suites.name = ?"
+            params.append(suite)
+        return self.query(f"""
+            SELECT targets.hostport, targets.student, suites.name AS suite, tests.test_id, tests.passed, tests.errors,
+                tests.status_code, tests.created, tests.run_id, timings.*
+            FROM tests
+            JOIN (SELECT MAX(tests.id) AS id FROM tests
+                JOIN targets ON targets.id = tests.target_id
+                JOIN suites ON suites.id = tests.suite_id
+                WHERE {cond}
+                GROUP BY tests.target_id, tests.suite_id, tests.test_id) latest ON latest.id = tests.id
+            JOIN targets ON targets.id = tests.target_id
+            JOIN suites ON suites.id = tests.suite_id
+            LEFT JOIN timings ON timings.test_row_id = tests.id
+            ORDER BY tests.id
+        """, params)
+
+
+    def test_history(self, target, suite, test_id, limit=100):
+        """Return the most recent results of a test of the target, newest first"""
+        cond, params = self.target_filter(target)
+        return self.query(f"""
+            SELECT targets.hostport, targets.student, suites.name AS suite, tests.test_id, tests.passed, tests.errors,
+                tests.status_code, tests.created, tests.run_id, timings.*
+            FROM tests
+            JOIN targets ON targets.id = tests.target_id
+            JOIN suites ON suites.id = tests.suite_id
+            LEFT JOIN timings ON timings.test_row_id = tests.id
+            WHERE {cond} AND suites.name = ? AND tests.test_id = ?
+            ORDER BY tests.id DESC LIMIT ?
+        """, params + [suite, test_id, limit])
+
+
+    def recent_runs(self, target=None, limit=100):
+        """Return the most recent runs with their pass and fail counts, newest first, optionally of a target"""
+        cond, params = self.target_filter(target) if target else ("1", [])
+        return self.query(f"""
+            SELECT runs.id, runs.source, runs.started, runs.finished, targets.hostport, targets.student,
+                SUM(tests.passed) AS passed, SUM(1 - tests.passed) AS failed
+            FROM runs
+            JOIN tests ON tests.run_id = runs.id
+            JOIN targets ON targets.id = tests.target_id
+            WHERE {cond}
+            GROUP BY runs.id, targets.id
+            ORDER BY runs.id DESC LIMIT ?
+        """, params + [limit])
+
+
+class RunRecorder():
+    """RunRecorder writes the results of a run to a ResultStore in batched transactions.
+    It must be used by a single thread, or by one thread at a time (e.g., one after another from a pool) if check_same_thread is unset."""
+
+    def __init__(self, store, source, batch_size=50, check_same_thread=True):
+        """Initialize a RunRecorder that commits every batch_size results"""
+        self.conn = store.connect(check_same_thread)
+        self.batch_size = batch_size
+        self.pending = []
+        self.ids = {}
+        with self.conn:
+            self.run_id = self.conn.execute("INSERT INTO runs (source, started) VALUES (?, ?)", (source, time.time())).lastrowid
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def row_id(self, table, column, value, **extra):
+        """Return the id of the row with the unique value of the column in a lookup table, inserting it if needed"""
+        key = (table, value)
+        if key not in self.ids:
+            row = self.conn.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()
+            if row:
+                self.ids[key] = row["id"]
+            else:
+                cols = [column, *extra]
+                self.ids[key] = self.conn.execute(f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})", (value, *extra.values())).lastrowid
+        return self.ids[key]
+
+
+    def add(self, hostport, result, student=None):
+        """Queue a test result against the hostport (of the student) to be written with the next batch"""
+        self.pending.append((hostport, student, result, time.time()))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+
+    def flush(self):
+        """Write all the queued results in a single transaction"""
+        if not self.pending:
+            return
+        with self.conn:
+            for hostport, student, result, created in self.pending:
+                target_id = self.row_id("targets", "hostport", hostport, student=student)
+                suite_id = self.row_id("suites", "name", result["suite"])
+                test_row_id = self.conn.execute(
+                    "INSERT INTO tests (run_id, target_id, suite_id, test_id, passed, errors, status_code, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, target_id, suite_id, result["id"], int(not result["errors"]), json.dumps(result["errors"]), result["res"]["status_code"], created)
+                ).lastrowid
+                timing = result["res"].get("timing", {})
+                self.conn.execute(
+                    f"INSERT INTO timings (test_row_id, {', '.join(TIMING_PHASES)}) VALUES (?{', ?' * len(TIMING_PHASES)})",
+                    (test_row_id, *[timing.get(phase) for phase in TIMING_PHASES])
+                )
+        self.pending = []
+
+
+    def close(self):
+        """Write the remaining results, mark the run as finished, and close the connection"""
+        try:
+            self.flush()
+            with self.conn:
+                self.conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id))
+        finally:
+            self.conn.close()
@@ -0,0 +1,44 @@
+import os
+import re
+import functools
+
+
+PLACEHOLDER = re.compile(b"<(\\w+)>")
+
+
+class MessageTemplate():
+    """MessageTemplate is a precompiled HTTP message file split into literal and placeholder segments"""
+
+    def __init__(self, msg):
+        """Initialize a MessageTemplate from raw message file contents with pipeline markers and line endings normalized"""
+        m = re.search(b"\r?\n\r?\n", msg)
+        hdrs, pld = (msg[:m.start()], msg[m.end():]) if m else (msg, b"")
+        msg = hdrs.replace(b"<PIPELINE>", b"").replace(b"\r", b"").replace(b"\n", b"\r\n") + b"\r\n\r\n" + pld
+        self.literals = []
+        self.placeholders = []
+        pos = 0
+        for m in PLACEHOLDER.finditer(msg):
+            self.literals.append(msg[pos:m.start()])
+            self.placeholders.append((m[1].decode(), m[0]))
+            pos = m.end()
+        self.literals.append(msg[pos:])
+
+
+    def render(self, replacements):
+        """Render the message with the replacements dict of placeholder names to bytes, unknown placeholders are kept as is"""
+        parts = [self.literals[0]]
+        for (name, raw), literal in zip(self.placeholders, self.literals[1:]):
+            parts.append(replacements.get(name, raw))
+            parts.append(literal)
+        return b"".join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_template(path):
+    with open(path, "rb") as f:
+        return MessageTemplate(f.read())
+
+
+def load_template(path):
+    """Return the precompiled MessageTemplate of a message file, loaded only once per process"""
+    return _load_template(os.path.normpath(path))
@@ -1,36 +1,110 @@
 import glob
-import traceback
+import json
 import os
+import importlib
+import traceback
+import collections.abc
 
 from inspect import isclass
 
+from servertester.base import httptester
 from servertester.base.httptester import HTTPTester
 
-def _import_all_modules():
-    """Dynamically import all test suite classes from all modules in this package"""
-    global __all__
-    __all__ = []
-    globals_, locals_ = globals(), locals()
-
-    testsuites = {}
-
-    pkd_dir = os.path.dirname(os.path.abspath(__file__))
-    for fpath in sorted(glob.glob(f"{pkd_dir}/*.py")):
-        mod_name = fpath.split("/")[-1].split(".")[0]
-        if not mod_name.startswith("_"):
-            pkg_mod = ".".join([__name__, mod_name])
-            try:
-                mod = __import__(pkg_mod, globals_, locals_, [mod_name])
-            except:
-                traceback.print_exc()
-                raise
-            for name, ref in mod.__dict__.items():
-                if not name.startswith("_") and name != "HTTPTester" and isclass(ref) and issubclass(ref, HTTPTester):
-                    globals_[name] = mod.__dict__[name]
-                    __all__.append(name)
-                    testsuites[name.lower()] = ref
-
-    globals_["testsuites"] = testsuites
-    __all__.append("testsuites")
-
-_import_all_modules()
+PKG_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = os.path.join(PKG_DIR, ".manifest.json")
+MANIFEST_VERSION = 1
+
+__all__ = ["testsuites"]
+
+
+def _source_mtimes():
+    """Modification times of all the test suite modules and the base tester that the manifest depends on"""
+    fpaths = [f for f in sorted(glob.glob(f"{PKG_DIR}/*.py")) if not os.path.basename(f).startswith("_")]
+    fpaths.append(os.path.abspath(httptester.__file__))
+    return {os.path.relpath(f, PKG_DIR): os.stat(f).st_mtime_ns for f in fpaths}
+
+
+def _import_module(mod_name):
+    try:
+        return importlib.import_module(f"{__name__}.{mod_name}")
+    except:
+        traceback.print_exc()
+        raise
+
+
+def _build_manifest(mtimes):
+    """Import all test suite modules to build a manifest of suite ids to their module, class, and test case metadata"""
+    suites = {}
+    for fname in mtimes:
+        mod_name, ext = os.path.splitext(fname)
+        if os.path.dirname(fname):
+            continue
+        mod = _import_module(mod_name)
+        for name, ref in mod.__dict__.items():
+            if not name.startswith("_") and name != "HTTPTester" and isclass(ref) and issubclass(ref, HTTPTester):
+                suites[name.lower()] = {"module": mod_name, "class": name, "testcases": ref.TESTCASES}
+    return {"version": MANIFEST_VERSION, "mtimes": mtimes, "suites": suites}
+
+
+def _load_manifest():
+    """Load the persisted manifest, regenerate (and persist) it if any of the modules changed since"""
+    mtimes = _source_mtimes()
+    try:
+        with open(MANIFEST) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and manifest.get("mtimes") == mtimes:
+            return manifest
+    except (OSError, ValueError) as e:
+        pass
+    manifest = json.loads(json.dumps(_build_manifest(mtimes), default=str))
+    try:
+        tmp = f"{MANIFEST}.{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, MANIFEST)
+    except OSError as e:
+        pass
+    return manifest
+
+
+class TestSuites(collections.abc.Mapping):
+    """A read-only mapping of suite ids to test suite classes, a suite module is imported only when it is first accessed"""
+
+    def __init__(self):
+        self._manifest = None
+
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = _load_manifest()
+        return self._manifest
+
+
+    def __getitem__(self, sid):
+        entry = self.manifest["suites"][sid]
+        return getattr(_import_module(entry["module"]), entry["class"])
+
+
+    def __iter__(self):
+        return iter(self.manifest["suites"])
+
+
+    def __len__(self):
+        return len(self.manifest["suites"])
+
+
+    def testcases(self, sid):
+        """Test case metadata of a suite from the manifest, without importing the suite module"""
+        return self.manifest["suites"][sid]["testcases"]
+
+
+testsuites = TestSuites()
+
+
+def __getattr__(name):
+    """Lazily resolve test suite classes by their names (e.g., `from servertester.testsuites import Example`)"""
+    for sid, entry in testsuites.manifest["suites"].items():
+        if entry["class"] == name:
+            return testsuites[sid]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -38,9 +38,7 @@ class CS531A5(HTTPTester):
         pld, rest = self.slice_payload(report["res"]["payload"], report)
         report["orig_hdr"] += report["res"]["raw_headers"] + "\r\n\r\n" + pld.decode()
         assert not report["errors"], "Failed to extract payload"
-        report["notes"].append(f"Parsing {postion.lower()} response")
-        self.parse_response(rest, report)
-        assert not report["errors"], f"{postion} response should be a valid HTTP Message"
+        self.next_response(report, postion)
 
 
     @HTTPTester.request("pipeline-oto.http", PATH1="/a5-test/limited3/protected", PATH2="/a5-test/env.cgi?var1=foo&var2=bar", PATH3="/a5-test/limited3/env.cgi", REFERER="/a5-test/index.html", AUTH="Basic amJvbGxlbjpqYm9sbGVu")
@@ -144,6 +142,7 @@ class CS531A5(HTTPTester):
         self.check_header_doesnt_contain(report, "Allow", "PUT")
 
 
+    @HTTPTester.serial
     @HTTPTester.request("get-url.http", PATH="/a5-test/limited4/foo/barbar.txt")
     def test_put_success_auth_digest(self, report):
         """Test whether PUT method creates a new resource with the request payload after successful Digest auth"""
@@ -163,12 +162,14 @@ class CS531A5(HTTPTester):
         self.check_header_contains(report, "Authentication-Info", digval["rspauth3"])
 
 
+    @HTTPTester.serial
     @HTTPTester.request("put-url-auth-basic.http", PATH="/a5-test/limited3/foobar.txt", AUTH="Basic YmRhOmJkYQ==")
     def test_put_success_auth_basic(self, report):
         """Test whether PUT method creates a new resource with the request payload after successful Basic auth"""
         self.check_status_is(report, 201)
 
 
+    @HTTPTester.serial
     @HTTPTester.request("get-url.http", PATH="/a5-test/limited4/foo/barbar.txt")
     def test_auth_created_files(self, report):
         """Test whether files created using PUT in earlier tests are auth protected properly"""
@@ -204,6 +205,7 @@ class CS531A5(HTTPTester):
         report["res"]["raw_headers"] = report["orig_hdr"]
 
 
+    @HTTPTester.serial
     @HTTPTester.request("pipeline-auth-dg.http", PATH="/a5-test/limited3/foobar.txt", AUTH="Basic YmRhOmJkYQ==")
     def test_delete_verify(self, report):
         """Test whether a DELETE request removes a resource and returns 404 on a subsequent GET"""
@@ -246,6 +248,7 @@ class CS531A5(HTTPTester):
         report["res"]["raw_headers"] = report["orig_hdr"]
 
 
+    @HTTPTester.serial
     @HTTPTester.request("get-url.http", PATH="/a5-test/limited4/foo/barbar.txt")
     def test_auth_get_delete(self, report):
         """Test whether a file that was PUT in an earlier test is auth protected, returns 200 OK on GET, and can be deleted successfully"""
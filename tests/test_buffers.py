@@ -0,0 +1,79 @@
+import hashlib
+import unittest
+from unittest import mock
+
+from servertester.base.buffers import ReceiveBuffer, SpooledPayload
+from servertester.base.framing import ResponseFramer
+from servertester.base.httptester import HTTPTester
+
+
+PIPELINED_REQUEST = b"GET /small HTTP/1.1\r\nHost: localhost\r\n\r\nGET /large HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+
+
+def response(body, **headers):
+    hdrs = "".join(f"{k.replace('_', '-')}: {v}\r\n" for k, v in headers.items())
+    return f"HTTP/1.1 200 OK\r\n{hdrs}\r\n".encode() + body
+
+
+class SpooledPayloadTest(unittest.TestCase):
+    """Tests of payloads that are spooled to a temporary file beyond the in-memory limit"""
+
+    def receive(self, chunks, spool_size=1024, msg=PIPELINED_REQUEST):
+        rbuf = ReceiveBuffer(size=256, spool_size=spool_size, preview_size=128)
+        framer = ResponseFramer(msg, rbuf)
+        for chunk in chunks:
+            rbuf.write(chunk)
+            framer.feed()
+        return rbuf, framer
+
+
+    def test_pipelined_spooled_digest(self):
+        small = b"tiny body with a blank line\r\n\r\ninside"
+        large = bytes(range(256)) * 64
+        data = response(small, Content_Length=len(small)) + response(large, Content_Length=len(large), Connection="close")
+        # Each response in its own read (framed before spilling) and both in a single read (spilled before framing)
+        for chunks in ([data[:len(data) - len(large) - 50], data[len(data) - len(large) - 50:]], [data]):
+            rbuf, framer = self.receive(chunks)
+            responses = HTTPTester().split_responses(rbuf, framer, 0)
+            self.assertEqual(len(responses), 2)
+            self.assertEqual(responses[0]["res"]["payload"], small)
+            payload = responses[1]["res"]["payload"]
+            self.assertIsInstance(payload, SpooledPayload)
+            self.assertEqual(len(payload), len(large))
+            self.assertEqual(payload.sha256(), hashlib.sha256(large).hexdigest())
+
+
+    def test_large_range_slice(self):
+        body = bytes(range(256)) * 64
+        rbuf = self.receive([response(body + b"extra", Content_Length=len(body))], msg=b"GET / HTTP/1.1\r\n\r\n")[0]
+        t = HTTPTester()
+        report = t.report_obj()
+        t.parse_response(rbuf.view(), report)
+        t.attach_spooled_payload(rbuf, report)
+        with mock.patch.object(SpooledPayload, "tobytes", side_effect=AssertionError("Spool read in memory")):
+            pld, rest = t.slice_payload(report["res"]["payload"], report)
+            self.assertEqual(len(pld), len(body))
+            self.assertEqual(pld.sha256(), hashlib.sha256(body).hexdigest())
+            self.assertTrue(pld.endswith(body[-64:]))
+            self.assertEqual(rest.sha256(), hashlib.sha256(b"extra").hexdigest())
+            self.assertTrue(rest.endswith(b"extra"))
+            window = pld[5000:9000]
+            self.assertEqual(window.sha256(), hashlib.sha256(body[5000:9000]).hexdigest())
+            self.assertEqual(pld[-1], body[-1])
+        self.assertEqual(window.tobytes(), body[5000:9000])
+        self.assertFalse(report["errors"])
+
+
+    def test_chunked_range_slice(self):
+        chunks = [bytes([i]) * 1000 for i in range(20)]
+        body = b"".join(f"{len(c):x}\r\n".encode() + c + b"\r\n" for c in chunks) + b"0\r\n\r\n"
+        rbuf = self.receive([response(body + b"extra", Transfer_Encoding="chunked")], msg=b"GET / HTTP/1.1\r\n\r\n")[0]
+        t = HTTPTester()
+        report = t.report_obj()
+        t.parse_response(rbuf.view(), report)
+        t.attach_spooled_payload(rbuf, report)
+        with mock.patch.object(SpooledPayload, "tobytes", side_effect=AssertionError("Spool read in memory")):
+            pld, rest = t.slice_payload(report["res"]["payload"], report)
+            self.assertEqual(pld.sha256(), hashlib.sha256(body).hexdigest())
+        self.assertEqual(rest.tobytes(), b"extra")
+        self.assertFalse(report["errors"])
@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import contextlib
+import socket
+import tempfile
+import threading
+import unittest
+
+from servertester.base.httptester import HTTPTester
+
+
+class BurstyServer():
+    """BurstyServer responds to HEAD probes right away and sends GET response bodies in bursts delimited by the connection close"""
+
+    def __init__(self, bursts, gap, first_byte_delay=0):
+        self.bursts = bursts
+        self.gap = gap
+        self.first_byte_delay = first_byte_delay
+        self.gets = 0
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+
+    def serve(self):
+        while True:
+            conn, addr = self.sock.accept()
+            threading.Thread(target=self.respond, args=(conn,), daemon=True).start()
+
+
+    def respond(self, conn):
+        with conn, contextlib.suppress(ConnectionError):
+            if conn.recv(65536).startswith(b"HEAD"):
+                conn.sendall(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n")
+                return
+            self.gets += 1
+            time.sleep(self.first_byte_delay)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n")
+            for burst in self.bursts:
+                time.sleep(self.gap)
+                conn.sendall(burst)
+
+
+    def close(self):
+        self.sock.close()
+
+
+class SlowSuite(HTTPTester):
+    """SlowSuite is a test suite of a few slow requests"""
+
+    @HTTPTester.request("get.http")
+    def test_first(self, report):
+        pass
+
+
+    @HTTPTester.request("get.http")
+    def test_second(self, report):
+        pass
+
+
+    @HTTPTester.request("get.http")
+    def test_third(self, report):
+        pass
+
+
+    @HTTPTester.request("get.http")
+    def test_fourth(self, report):
+        pass
+
+
+class AsyncRunnerTest(unittest.TestCase):
+    """Tests of running test cases concurrently on an event loop"""
+
+    def setUp(self):
+        self.msgdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.msgdir.name, "get.http"), "w") as f:
+            f.write("GET / HTTP/1.1\r\nHost: <HOSTPORT>\r\n\r\n")
+        self.server = BurstyServer([b"slow"], 0.3)
+        self.tester = SlowSuite(f"127.0.0.1:{self.server.port}")
+        self.tester.MSGDIR = self.msgdir.name
+
+
+    def tearDown(self):
+        self.server.close()
+        self.msgdir.cleanup()
+
+
+    def test_closing_results_cancels_pending_tests(self):
+        async def first_result():
+            async with contextlib.aclosing(self.tester.arun_all_tests(1)) as results:
+                async for result in results:
+                    break
+            # Keep the loop running long enough for all the tests to finish, if they were still going
+            await asyncio.sleep(1.5)
+            return result
+        self.assertFalse(asyncio.run(first_result())["errors"])
+        # The next test may have started by the time the results are closed, but none after it
+        self.assertLessEqual(self.server.gets, 2)
+
+
+class CalibrationTest(unittest.TestCase):
+    """Tests of socket timeouts calibrated from round trip times"""
+
+    def setUp(self):
+        self.msgdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.msgdir.name, "get.http"), "w") as f:
+            f.write("GET / HTTP/1.1\r\nHost: <HOSTPORT>\r\n\r\n")
+        self.server = BurstyServer([b"first ", b"second ", b"third"], 0.3)
+        self.tester = HTTPTester(f"127.0.0.1:{self.server.port}")
+        self.tester.MSGDIR = self.msgdir.name
+
+
+    def tearDown(self):
+        self.server.close()
+        self.msgdir.cleanup()
+
+
+    def test_slow_unframed_body(self):
+        calibration = self.tester.calibrate_timeouts()
+        self.assertEqual(len(calibration["first_byte_rtts"]), self.tester.CALIBRATION_PROBES)
+        self.assertGreaterEqual(self.tester.RECV_END_TIMEOUT, 0.5)
+        report = self.tester.netcat("get.http")
+        self.assertFalse(report["errors"])
+        self.assertEqual(report["res"]["payload"], b"first second third")
+        report = self.tester.netcat("get.http", skip_parsing=True)
+        self.assertFalse(report["errors"])
+        self.assertTrue(report["res"]["raw_headers"].endswith("\r\n\r\nfirst second third"))
+
+
+    def test_slow_first_byte(self):
+        # Like a CGI script that takes a while to start, unlike the trivial probes
+        self.server.first_byte_delay = 0.3
+        self.tester.calibrate_timeouts()
+        self.assertGreaterEqual(self.tester.RECV_FIRST_BYTE_TIMEOUT, 1.0)
+        report = self.tester.netcat("get.http")
+        self.assertFalse(report["errors"])
+        self.assertEqual(report["res"]["payload"], b"first second third")
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import unittest
+import http.server
+
+from servertester.base.roster import Roster
+
+
+MEMBERS_CSV = "csid,name,ghid,repo\nalice,Alice,alice-gh,alice-server\n"
+MORE_MEMBERS_CSV = MEMBERS_CSV + "bob,Bob,bob-gh,bob-server\n"
+
+
+class RosterServer(http.server.ThreadingHTTPServer):
+    """RosterServer serves a members CSV with an ETag and Last-Modified, answering conditional requests with 304"""
+
+    def __init__(self, content):
+        self.content = content
+        self.gets = 0
+        self.not_modified = 0
+        super().__init__(("127.0.0.1", 0), RosterHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/members.csv"
+
+
+    @property
+    def etag(self):
+        return f'"{len(self.content)}"'
+
+
+class RosterHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.gets += 1
+        if self.headers.get("If-None-Match") == self.server.etag:
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.server.content.encode()
+        self.send_response(200)
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Last-Modified", "Tue, 01 Oct 2019 00:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, *args):
+        pass
+
+
+class RosterTest(unittest.TestCase):
+    """Tests of revalidating and caching the members roster"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.dir.name, "members.cache.json")
+        self.csv_path = os.path.join(self.dir.name, "members.csv")
+        self.server = RosterServer(MEMBERS_CSV)
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.dir.cleanup()
+
+
+    def write_csv(self, content, mtime):
+        with open(self.csv_path, "w") as f:
+            f.write(content)
+        os.utime(self.csv_path, (mtime, mtime))
+
+
+    def test_local_file_mtime(self):
+        self.write_csv(MEMBERS_CSV, 1000000000)
+        for source in (self.csv_path, f"file://{self.csv_path}"):
+            roster = Roster(source, self.cache_path)
+            self.assertTrue(roster.refresh())
+            self.assertEqual(roster._members["alice"], {"name": "Alice", "ghid": "alice-gh", "repo": "alice-server"})
+            self.assertEqual(roster.validators, {"mtime": 1000000000})
+            self.assertFalse(roster.refresh())
+        # Rewritten files are only read again once their modification time changes
+        self.write_csv(MORE_MEMBERS_CSV, 1000000000)
+        self.assertFalse(roster.refresh())
+        self.write_csv(MORE_MEMBERS_CSV, 1000000060)
+        self.assertTrue(roster.refresh())
+        self.assertIn("bob", roster._members)
+
+
+    def test_url_revalidation(self):
+        roster = Roster(self.server.url, self.cache_path)
+        self.assertTrue(roster.refresh())
+        self.assertEqual(set(roster._members), {"alice"})
+        self.assertEqual(roster.validators, {"etag": self.server.etag, "last_modified": "Tue, 01 Oct 2019 00:00:00 GMT"})
+        self.assertFalse(roster.refresh())
+        self.assertEqual((self.server.gets, self.server.not_modified), (2, 1))
+        self.assertEqual(set(roster._members), {"alice"})
+        self.server.content = MORE_MEMBERS_CSV
+        self.assertTrue(roster.refresh())
+        self.assertEqual(set(roster._members), {"alice", "bob"})
+        self.assertEqual(roster.validators["etag"], self.server.etag)
+
+
+    def test_cache_reload(self):
+        roster = Roster(self.server.url, self.cache_path)
+        self.assertTrue(roster.refresh())
+        reloaded = Roster(self.server.url, self.cache_path)
+        reloaded.load_cache()
+        self.assertEqual(reloaded._members, roster._members)
+        self.assertEqual(reloaded.validators, roster.validators)
+        self.assertEqual(reloaded.fetched, roster.fetched)
+        # The cached validators are used right away, so an unchanged roster is not downloaded again
+        self.assertFalse(reloaded.refresh())
+        self.assertEqual(self.server.not_modified, 1)
+        # The cache of another source is ignored
+        other = Roster(self.csv_path, self.cache_path)
+        other.load_cache()
+        self.assertIsNone(other._members)
+        self.assertEqual(other.validators, {})
@@ -0,0 +1,71 @@
+import os
+import json
+import socket
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+from servertester.base.buffers import ReceiveBuffer, SpooledPayload
+from servertester.base.httptester import HTTPTester
+
+# The app connects to the Docker daemon and opens its result store when it is imported
+STORE_DIR = tempfile.TemporaryDirectory()
+with mock.patch.dict(os.environ, {"RESULTSDB": os.path.join(STORE_DIR.name, "results.sqlite3")}), mock.patch("docker.from_env"):
+    import server
+
+
+class PayloadCacheTest(unittest.TestCase):
+    """Tests of full payloads of results that are kept to be fetched by result id"""
+
+    def result(self, body, spool_size):
+        rbuf = ReceiveBuffer(size=256, spool_size=spool_size)
+        rbuf.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        t = HTTPTester()
+        report = t.report_obj()
+        t.parse_response(rbuf.view(), report)
+        t.attach_spooled_payload(rbuf, report)
+        return {"id": "test_payload", "suite": "example", "errors": [], "notes": [], "req": report["req"], "res": report["res"]}
+
+
+    def fetch(self, result_id):
+        res = server.app.test_client().get(f"/payloads/{result_id}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers["Content-Type"], "text/plain")
+        return res.get_data()
+
+
+    def test_spooled_payload_not_read_in_memory(self):
+        body = os.urandom(100000)
+        result = self.result(body, 4096)
+        self.assertIsInstance(result["res"]["payload"], SpooledPayload)
+        with mock.patch.object(SpooledPayload, "tobytes", side_effect=AssertionError("Spool read in memory")):
+            server.jsonify_result(result)
+            self.assertEqual(result["res"]["payload_sha256"], hashlib.sha256(body).hexdigest())
+            self.assertEqual(self.fetch(result["result_id"]), body)
+
+
+    def test_in_memory_payload(self):
+        body = b"small payload"
+        result = self.result(body, None)
+        server.jsonify_result(result)
+        self.assertEqual(self.fetch(result["result_id"]), body)
+
+
+class ResultCacheTest(unittest.TestCase):
+    """Tests of results cached per deployed image"""
+
+    def closed_port(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+
+    def test_results_cached_per_port(self):
+        ports = [self.closed_port(), self.closed_port()]
+        client = server.app.test_client()
+        with mock.patch.object(server, "deployed_image", return_value="image"):
+            for port in ports + ports:
+                res = client.get(f"/tests/localhost:{port}/example/test_healthy_server")
+                self.assertEqual(res.status_code, 200)
+                self.assertIn(f"Host: localhost:{port}", json.loads(res.get_data())["req"]["raw"])